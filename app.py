@@ -24,6 +24,15 @@ st.session_state.neo4j_username = st.secrets['NEO4J_USERNAME']
 st.session_state.neo4j_database = st.secrets['NEO4J_DATABASE']
 st.session_state.neo4j_password = st.secrets['NEO4J_PASSWORD']
 
+@st.cache_resource(show_spinner=False)
+def start_warmup():
+    """服务启动后在后台预加载短信识别模型，每个进程只会启动一次；失败后由短信识别页按间隔重试"""
+    from recognize import warmup
+    warmup.start(warmup.msg_cls_options(st.secrets))
+
+
+start_warmup()
+
 st.logo("assets/logo_name_new.png", size="large", icon_image="assets/logo.png")
 
 start_page = st.Page("start_page.py", title="欢迎", icon="🎉")
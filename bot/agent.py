@@ -1,5 +1,8 @@
+import time
+
 from .llm import llm
 from .graph import graph
+from .router import init_router
 
 # Create a anti-fraud chat chain
 from langchain_core.prompts import ChatPromptTemplate
@@ -138,8 +141,35 @@ def generate_response_stream(user_input):
     and returns a response to be rendered in the UI
     """
 
+    started = time.perf_counter()
     response = chat_agent.stream(
         {"input": user_input},
         {"configurable": {"session_id": get_session_id()}},)
 
-    return response
\ No newline at end of file
+    def timed_response():
+        yield from response
+        init_router().record("agent", time.perf_counter() - started)
+
+    return timed_response()
+
+def generate_fast_response(user_input):
+    """
+    Answer clear-cut questions by calling the routed tool directly,
+    skipping the agent's tool selection. Returns None when the router
+    cannot decide, so the caller falls back to the agent.
+    """
+    router = init_router()
+    route = router.route(user_input)
+    if route is None:
+        return None
+
+    started = time.perf_counter()
+    if route == "graph":
+        answer = cypher_qa(user_input)["result"]
+    else:
+        answer = antiFraud_chat.invoke({"input": user_input})
+    history = get_memory(get_session_id())
+    history.add_user_message(user_input)
+    history.add_ai_message(answer)
+    router.record(route, time.perf_counter() - started)
+    return answer
\ No newline at end of file
@@ -1,11 +1,150 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
 import streamlit as st
+from streamlit.logger import get_logger
 
 # Connect to Neo4j
 from langchain_neo4j import Neo4jGraph
 
+from .tools.cypher_cache import CHAT_HISTORY_LABELS, CHAT_HISTORY_TYPES, KG_VERSION_QUERY
+
+SCHEMA_CACHE_DIR = "model/neo4j_schema"
+
+logger = get_logger(__name__)
+
+# 不在连接时内省 schema，图谱较大时内省很慢，改为从磁盘缓存读取
 graph = Neo4jGraph(
     url=st.session_state.neo4j_uri,
     username=st.session_state.neo4j_username,
     password=st.session_state.neo4j_password,
     database=st.session_state.neo4j_database,
-)
\ No newline at end of file
+    refresh_schema=False,
+)
+
+
+_version_lock = threading.Lock()
+_version = {"value": None, "checked": 0.0}
+
+
+def _count(query):
+    return graph.query(query)[0]["count"]
+
+
+def kg_version(max_age=60):
+    """
+    知识图谱版本戳：(:KGVersion) 节点上的版本号，以及节点数与关系数（不含聊天记录）。
+
+    只修改属性、或删除与新增的数量相同时，节点数与关系数不会变化，
+    因此导入或修改数据后必须递增版本号（python scripts/bump_kg_version.py），
+    Cypher 缓存、schema 缓存与预计算答案才会失效。
+    结果在 max_age 秒内复用，避免每次问答都查询数据库；计数都直接读取数据库的计数存储。
+    """
+    with _version_lock:
+        if _version["value"] is None or time.monotonic() - _version["checked"] > max_age:
+            data_version = graph.query(KG_VERSION_QUERY)[0]["version"]
+            nodes = _count("MATCH (n) RETURN count(n) AS count") - sum(
+                _count(f"MATCH (n:`{label}`) RETURN count(n) AS count") for label in CHAT_HISTORY_LABELS
+            )
+            relationships = _count("MATCH ()-[r]->() RETURN count(r) AS count") - sum(
+                _count(f"MATCH ()-[r:`{type_}`]->() RETURN count(r) AS count") for type_ in CHAT_HISTORY_TYPES
+            )
+            _version["value"] = f"{data_version}:{nodes}:{relationships}"
+            _version["checked"] = time.monotonic()
+        return _version["value"]
+
+
+# ---------------------------
+# schema 缓存
+# ---------------------------
+_schema_version = {"value": None}
+# 缓存文件按数据库地址与数据库名区分；后台线程读取不到 session_state，导入时先算好
+_database_key = hashlib.sha256(
+    f"{st.session_state.neo4j_uri}/{st.session_state.neo4j_database}".encode("utf-8")
+).hexdigest()[:16]
+
+
+def schema_path(version):
+    return os.path.join(SCHEMA_CACHE_DIR, f"{_database_key}_{version.replace(':', '_')}.json")
+
+
+def _cached_schema_paths():
+    """同一数据库各版本的 schema 缓存文件"""
+    if not os.path.isdir(SCHEMA_CACHE_DIR):
+        return []
+    return [
+        os.path.join(SCHEMA_CACHE_DIR, name)
+        for name in os.listdir(SCHEMA_CACHE_DIR) if name.startswith(_database_key + "_") and name.endswith(".json")
+    ]
+
+
+def _apply_schema(cached, version):
+    graph.schema = cached["schema"]
+    graph.structured_schema = cached["structured_schema"]
+    _schema_version["value"] = version
+
+
+def introspect_schema(version):
+    """内省数据库 schema 并写入缓存，删除同一数据库旧版本的缓存"""
+    start = time.perf_counter()
+    graph.refresh_schema()
+    logger.info("Introspected Neo4j schema in %.1fs", time.perf_counter() - start)
+    path = schema_path(version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"schema": graph.schema, "structured_schema": graph.structured_schema}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    for old_path in _cached_schema_paths():
+        if old_path != path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                logger.warning("Failed to remove stale schema cache %s", old_path)
+    _apply_schema({"schema": graph.schema, "structured_schema": graph.structured_schema}, version)
+
+
+def load_schema(version):
+    """
+    读取当前版本的 schema 缓存，返回是否需要重新内省。
+
+    没有当前版本的缓存时先使用同一数据库最近一次的缓存，由调用方在后台内省；
+    从未缓存过时才同步内省。
+    """
+    path = schema_path(version)
+    if not os.path.exists(path):
+        candidates = _cached_schema_paths()
+        if not candidates:
+            introspect_schema(version)
+            return False
+        path = max(candidates, key=os.path.getmtime)
+    with open(path, "r", encoding="utf-8") as f:
+        cached = json.load(f)
+    _apply_schema(cached, version if path == schema_path(version) else None)
+    return _schema_version["value"] != version
+
+
+def _refresh_schema_periodically(interval, stale):
+    """定期检查知识图谱版本，版本变化时重新内省 schema 并更新缓存"""
+    while True:
+        if not stale:
+            time.sleep(interval)
+        stale = False
+        try:
+            version = kg_version(max_age=0)
+            if version != _schema_version["value"]:
+                introspect_schema(version)
+        except Exception:
+            logger.exception("Failed to refresh Neo4j schema")
+
+
+stale = load_schema(kg_version())
+threading.Thread(
+    target=_refresh_schema_periodically,
+    args=(st.secrets.get("NEO4J_SCHEMA_REFRESH_INTERVAL", 600), stale),
+    name="neo4j-schema-refresh",
+    daemon=True,
+).start()
@@ -1,5 +1,5 @@
-from openai import api_key, embeddings
 import streamlit as st
+from llm_gateway import init_llm_gateway
 
 # Create the LLM
 from langchain_openai import ChatOpenAI
@@ -7,7 +7,8 @@ from langchain_openai import ChatOpenAI
 llm = ChatOpenAI(
     openai_api_key = st.session_state.openai_api_key,
     model = st.session_state.openai_model,
-    base_url=st.session_state.openai_base_url
+    base_url=st.session_state.openai_base_url,
+    http_client=init_llm_gateway().http_client,
 )
 
 # Create the Embedding model
@@ -17,4 +18,5 @@ from langchain_openai import OpenAIEmbeddings
 
 embeddings = OpenAIEmbeddings(
     openai_api_key = st.session_state.openai_api_key,
+    http_client=init_llm_gateway().http_client,
 )
\ No newline at end of file
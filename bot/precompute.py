@@ -0,0 +1,131 @@
+"""
+示例问题答案预计算。
+
+bot_page 中的示例问题点击最多，每次点击都要完整运行一遍 ReAct 智能体。
+这里在后台用当前知识图谱预先回答这些问题，保存最终答案与执行过的 Cypher，
+点击时直接展示；结果文件超过 max_age 秒后在后台检查知识图谱版本戳，变化时重新计算。
+"""
+import json
+import os
+import threading
+import time
+
+from streamlit.logger import get_logger
+
+from .tools.cypher_cache import normalize_question
+
+PRECOMPUTE_PATH = "model/bot_answers.json"
+# 预计算结果超过这个时间（秒）后重新检查知识图谱版本
+PRECOMPUTE_MAX_AGE = 3600
+
+logger = get_logger(__name__)
+_lock = threading.Lock()
+_refreshing = False
+_store = {"mtime": None, "data": {"version": None, "questions": [], "answers": {}}}
+
+
+def load(path=PRECOMPUTE_PATH):
+    """读取预计算结果，文件未变化时复用内存中的副本"""
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    with _lock:
+        if mtime != _store["mtime"]:
+            data = {"version": None, "questions": [], "answers": {}}
+            if mtime is not None:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            _store.update(mtime=mtime, data=data)
+        return _store["data"]
+
+
+def save(data, path=PRECOMPUTE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def answer_question(agent_executor, question):
+    """不带会话历史运行智能体，返回最终答案与执行过的 Cypher"""
+    from .tools.cypher import trace_cypher
+
+    with trace_cypher() as queries:
+        output = agent_executor.invoke({"input": question, "chat_history": ""})["output"]
+    return {"question": question, "answer": output, "cypher": list(queries), "generated_at": time.time()}
+
+
+def precompute(agent_executor, questions, version, path=PRECOMPUTE_PATH):
+    start = time.perf_counter()
+    answers = {}
+    for question in questions:
+        try:
+            answers[normalize_question(question)] = answer_question(agent_executor, question)
+        except Exception:
+            logger.exception("Failed to precompute answer for %r", question)
+    # questions 记录本次尝试过的问题，失败的问题等到图谱更新后再重试
+    save({"version": version, "questions": list(questions), "answers": answers}, path)
+    logger.info("Precomputed %d/%d example answers in %.1fs", len(answers), len(questions), time.perf_counter() - start)
+
+
+def is_stale(questions, path=PRECOMPUTE_PATH, max_age=PRECOMPUTE_MAX_AGE):
+    """只根据结果文件判断：文件不存在、示例问题列表变化或超过 max_age 秒未检查"""
+    data = load(path)
+    with _lock:
+        mtime = _store["mtime"]
+    return mtime is None or data["questions"] != list(questions) or time.time() - mtime > max_age
+
+
+def _refresh(agent_executor, kg_version, questions, path):
+    global _refreshing
+    try:
+        version = kg_version()
+        data = load(path)
+        if data["version"] == version and data["questions"] == questions:
+            # 知识图谱没有变化，只更新文件时间，max_age 之后再检查
+            os.utime(path)
+        else:
+            precompute(agent_executor, questions, version, path)
+    except Exception:
+        logger.exception("Failed to refresh precomputed example answers")
+    finally:
+        with _lock:
+            _refreshing = False
+
+
+def refresh_if_stale(questions, path=PRECOMPUTE_PATH, max_age=PRECOMPUTE_MAX_AGE):
+    """
+    预计算结果过期时，在后台线程检查知识图谱版本，版本或示例问题列表变化时重新计算。
+
+    结果未过期时只读取结果文件，不导入智能体与数据库连接。
+    需在页面脚本中调用：智能体依赖会话中的大模型与数据库配置，导入必须在脚本线程完成。
+    """
+    global _refreshing
+    if not is_stale(questions, path, max_age):
+        return False
+    with _lock:
+        if _refreshing:
+            return False
+        _refreshing = True
+    try:
+        from .agent import agent_executor
+        from .graph import kg_version
+    except Exception as e:
+        with _lock:
+            _refreshing = False
+        logger.warning("Skip precomputing example answers: %s", e)
+        return False
+    threading.Thread(
+        target=_refresh, args=(agent_executor, kg_version, list(questions), path), name="bot-precompute", daemon=True
+    ).start()
+    return True
+
+
+def lookup(question, path=PRECOMPUTE_PATH):
+    """返回与当前知识图谱版本一致的预计算答案，没有时返回 None"""
+    from .graph import kg_version
+
+    data = load(path)
+    entry = data["answers"].get(normalize_question(question))
+    if entry is None or data["version"] != kg_version():
+        return None
+    return entry
@@ -0,0 +1,76 @@
+"""
+问答助手的本地问题路由。
+
+ReAct 智能体每轮至少要两次大模型调用才能决定使用哪个工具。
+对意图明确的问题，这里用关键词规则直接选定工具：
+查询案件数据的问题交给知识图谱工具，反诈常识类问题交给通用对话；
+追问、多步骤或无法判断的问题返回 None，仍由智能体处理。
+"""
+import json
+import threading
+
+import streamlit as st
+
+# 知识图谱中的实体与关系
+GRAPH_TERMS = ("案件", "案例", "嫌疑人", "被害人", "被告", "判决", "罪名", "涉案", "涉及", "案发", "团伙", "金额", "知识图谱")
+# 查询、统计类的提问方式
+QUERY_TERMS = ("哪些", "多少", "几个", "几起", "占比", "比例", "列出", "列举", "统计", "最多", "最高", "排名", "有没有")
+# 反诈常识类的提问方式
+CHAT_TERMS = ("如何", "怎么", "怎样", "防范", "预防", "识别", "应对", "建议", "注意", "为什么", "什么是", "介绍", "报警")
+# 依赖上下文的追问，或需要多个步骤的问题
+FOLLOW_UP_TERMS = ("刚才", "上面", "上述", "这些", "那些", "继续", "还有", "它们", "他们", "然后", "并且", "对比", "比较")
+FRAUD_TERMS = ("诈骗", "骗局", "被骗", "骗子", "反诈", "电诈")
+
+
+class QuestionRouter:
+    def __init__(self, extractor):
+        self.extractor = extractor
+        self.lock = threading.Lock()
+        self.counts = {"graph": 0, "chat": 0, "agent": 0}
+        self.latency = {"graph": 0.0, "chat": 0.0, "agent": 0.0}
+
+    def route(self, question):
+        """返回 "graph"、"chat"，无法明确判断时返回 None"""
+        if any(term in question for term in FOLLOW_UP_TERMS):
+            return None
+        graph = any(term in question for term in GRAPH_TERMS)
+        query = any(term in question for term in QUERY_TERMS)
+        chat = any(term in question for term in CHAT_TERMS)
+        if graph and query and not chat:
+            return "graph"
+        if chat and not graph and not query:
+            # 与反诈无关的问题交给智能体按提示词拒答
+            fraud = any(term in question for term in FRAUD_TERMS) or self.extractor.extract(question)["关键词"] != ["无"]
+            return "chat" if fraud else None
+        return None
+
+    def record(self, path, seconds):
+        """记录一次回答的路径（graph / chat / agent）与耗时"""
+        with self.lock:
+            self.counts[path] += 1
+            self.latency[path] += seconds
+
+    def stats(self):
+        with self.lock:
+            total = sum(self.counts.values())
+            fast = self.counts["graph"] + self.counts["chat"]
+            mean = {path: self.latency[path] / count for path, count in self.counts.items() if count}
+            # 按智能体路径的平均耗时估算快速路由节省的时间
+            saved = fast * mean["agent"] - self.latency["graph"] - self.latency["chat"] if "agent" in mean else None
+            return {
+                "requests": total,
+                "fast_fraction": round(fast / total, 4) if total else 0.0,
+                "routes": dict(self.counts),
+                "mean_latency_s": {path: round(seconds, 3) for path, seconds in mean.items()},
+                "estimated_saved_s": round(saved, 1) if saved is not None else None,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def init_router():
+    """所有会话共享的问题路由，复用短信识别的诈骗关键词表与 jieba 分词"""
+    from recognize.features import FeatureExtractor
+
+    with open("recognize/fraud_keywords.json", "r", encoding="utf-8") as f:
+        keywords = json.load(f)
+    return QuestionRouter(FeatureExtractor([word for word, _ in keywords]))
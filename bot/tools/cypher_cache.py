@@ -0,0 +1,125 @@
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import streamlit as st
+
+# 生成的 Cypher 中出现这些子句时视为写操作，不缓存
+WRITE_CLAUSES = re.compile(r"\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|LOAD\s+CSV|FOREACH)\b", re.IGNORECASE)
+
+# 知识图谱数据版本号，保存在唯一的 (:KGVersion) 节点上，导入或修改数据后由导入脚本递增
+KG_VERSION_QUERY = "OPTIONAL MATCH (v:KGVersion) RETURN coalesce(max(v.version), 0) AS version"
+BUMP_KG_VERSION_QUERY = (
+    "MERGE (v:KGVersion) SET v.version = coalesce(v.version, 0) + 1, v.updated_at = datetime() "
+    "RETURN v.version AS version"
+)
+# 问答助手的聊天记录（Neo4jChatMessageHistory）写在同一个数据库中，统计数量时排除
+CHAT_HISTORY_LABELS = ("Session", "Message")
+CHAT_HISTORY_TYPES = ("LAST_MESSAGE", "NEXT")
+
+
+def normalize_question(question):
+    """全角转半角、合并空白、去掉句末标点，使同一问题的不同写法得到相同的缓存键"""
+    question = unicodedata.normalize("NFKC", question)
+    question = re.sub(r"\s+", " ", question).strip().lower()
+    return question.rstrip("?？。.!！~～ ")
+
+
+def is_read_only(cypher):
+    return not WRITE_CLAUSES.search(cypher)
+
+
+class _VersionedStore:
+    """有界 LRU，条目记录写入时的知识图谱版本，版本变化或超过 ttl 秒后失效"""
+
+    def __init__(self, capacity, ttl):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        entry = self.entries.get(key)
+        if entry is not None and (entry[0] != version or time.monotonic() - entry[1] > self.ttl):
+            del self.entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, key, version, value):
+        self.entries[key] = (version, time.monotonic(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class CypherCache:
+    """
+    Cypher 问答的两级缓存。
+
+    questions：规范化后的问题 → 执行成功且有结果的只读 Cypher，命中时跳过 Cypher 生成；
+    rows：(Cypher, 参数) → 查询结果，命中时跳过数据库查询。
+    两级缓存都以知识图谱版本戳区分，图谱数据变化后旧条目自动失效。
+    """
+
+    def __init__(self, capacity=1000, ttl=3600):
+        self.lock = threading.Lock()
+        self.questions = _VersionedStore(capacity, ttl)
+        self.rows = _VersionedStore(capacity, ttl)
+
+    @staticmethod
+    def _rows_key(cypher, params):
+        return hashlib.sha256(
+            json.dumps([cypher, params or {}], ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def get_cypher(self, question, version):
+        with self.lock:
+            return self.questions.get(normalize_question(question), version)
+
+    def put_cypher(self, question, version, cypher):
+        if not is_read_only(cypher):
+            return
+        with self.lock:
+            self.questions.put(normalize_question(question), version, cypher)
+
+    def get_rows(self, cypher, params, version):
+        with self.lock:
+            return self.rows.get(self._rows_key(cypher, params), version)
+
+    def put_rows(self, cypher, params, version, rows):
+        if not is_read_only(cypher):
+            return
+        with self.lock:
+            self.rows.put(self._rows_key(cypher, params), version, rows)
+
+    def stats(self):
+        with self.lock:
+            return {"questions": self.questions.stats(), "rows": self.rows.stats()}
+
+
+@st.cache_resource(show_spinner=False)
+def init_cypher_cache():
+    """所有会话共享的 Cypher 问答缓存"""
+    return CypherCache(
+        capacity=st.secrets.get("CYPHER_CACHE_CAPACITY", 1000),
+        ttl=st.secrets.get("CYPHER_CACHE_TTL", 3600),
+    )
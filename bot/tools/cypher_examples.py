@@ -0,0 +1,434 @@
+"""
+Cypher 生成提示词的组成部分，以及按问题动态挑选的示例与 schema 片段。
+
+完整的手写 schema、自动内省的 schema 与全部示例每次都发送会占用大量输入 token。
+这里按字符二元组相似度挑选最相近的 k 个示例，只保留问题与示例涉及的节点类型和关系类型。
+"""
+import math
+import re
+from collections import Counter
+
+CYPHER_INSTRUCTIONS = """
+You are an expert Neo4j Developer translating user questions into Cypher to answer questions about Fraud cases.
+Convert the user's question based on the schema.
+
+Use only the provided relationship types and properties in the schema.
+Do not use any other relationship types or properties that are not provided.
+
+Do not return entire nodes or embedding properties.
+
+Fine Tuning:
+
+- Cypher 代码中，所有实体与关系按照给定的 Schema 定义，不要翻译中英文。
+- 尽量只返回所需的信息，不要返回整个节点或关系。
+- 如果需要概述性的回答问题，可以返回某个节点的 `description` 属性。
+- 当需要列出结点（如案例、人物、机构等）时，需要使用 `LIMIT` 限制返回结果的数量。最多返回 8 个案例即可。
+- 当需要举例时，如果结点具有 `name` 和 `description` 属性，可以返回这两个属性。
+- 请确保 Cypher 代码的正确性，不要包含语法错误。
+- 如果需要查找的信息比较笼统（例如概括案件），可以到 `description` 或 `content` 属性（如果有）中以部分关键词查找更多信息。关键词可以更精炼，以匹配更多的案例进行筛选。
+"""
+
+# 生成 Cypher 时的提示词，schema 由 select_context 按问题拼出
+CYPHER_GENERATION_TEMPLATE = CYPHER_INSTRUCTIONS + """
+{schema}
+
+Question:
+{question}
+"""
+
+NODE_SECTIONS = {
+    "案件": """
+#### **案件**
+- **属性**：
+  - `name`：案件的名称，字符串类型。
+  - `type`：案件类型，分类标签，枚举类型，取值范围为：`刑事`、`民事`、`行政`、`执行`、`其他`。
+  - `description`：案件的简单描述，文本类型。
+  - `date_of_incident`：案发时间，Date 类型，如 `date("2020-01-01")`。（不可缺失）
+  - `date_of_judgment`：审判时间，Date 类型，如 `date("2020-01-01")`。（可缺失）
+""",
+    "人物": """
+#### **人物**（尽量不要缺失）
+- **属性**：
+  - `name`：人物的全名，字符串类型。
+  - `gender`：枚举类型，取值范围为：`男`、`女`、`未知`。（可缺失）
+  - `birthday`：Date 类型。（可缺失）
+  - `career`：人物的职业，字符串类型。（可缺失）
+  - `education`：人物的学历或教育经历，字符串类型。（可缺失）
+  - `description`：关于人物的详细描述，文本类型。
+""",
+    "机构": """
+#### **机构**（可缺失）
+- **属性**：
+  - `name`：机构的全称，字符串类型。
+  - `type`：分类标签，字符串类型，可以是：`政府机构`、`企业`、`事业单位`、`社会团体`、 等（可缺失）
+  - `description`：关于机构的详细描述，文本类型。
+""",
+    "地点": """
+#### **地点**（尽量不要缺失）
+- **属性**：
+  - `name`：地点的详细地址，字符串类型。
+  - `province`：省/自治区/直辖市名称，不需要行政区划名，字符串类型（如“广东”，不要写成“广东省”）。
+  - `city`：地级市名称，不需要行政区划名，字符串类型（如“广州”，不要写成“广州市”）。（可缺失）
+  - `district`：区/县名称，不需要行政区划名，字符串类型（如“天河”，不要写成“天河区”）。（可缺失）
+""",
+    "工具": """
+#### **工具**（尽量不要缺失）
+- **属性**：
+  - `name`：工具的名称，字符串类型。
+  - `type`：分类标签，枚举类型，取值范围为：`社交软件`、`银行卡`、`手机`、`短信`、`其他`。
+  - `usage`：工具在诈骗中的用途，字符串类型（如“冒充好友”、“冒充公检法”）。
+""",
+    "诈骗类型": """
+#### **诈骗类型**（不能缺失！！）
+- **属性**：
+  - `name`：诈骗类型的名称，字符串类型。
+  - `subtype`：诈骗的具体手法，字符串类型（如“冒充公检法”、“虚假投资”）。
+""",
+    "实体资产": """
+#### **实体资产**
+- **属性**：
+  - `name`：资产的名称，字符串类型。
+  - `type`：分类标签，字符串类型，可以为：`房产`、`车辆`、`股票`、`钱财`、等
+  - `amount`：资产的数量，数值类型。
+  - `unit`：资产的计量单位，字符串类型（如“元”、“平方米”、“套”）。
+""",
+    "罪名": """
+#### **罪名**（可缺失）
+- **属性**：
+  - `name`：罪名的全称，字符串类型。
+""",
+    "法律法规": """
+#### **法律法规**（可缺失）
+- **属性**：
+  - `name`：法律法规的名称，字符串类型。
+  - `type`：分类标签，字符串类型，可以为：`刑法`、`民法`、`行政法`、`商法`、`其他`。
+  - `description`：法律法规的具体条款或内容，文本类型。
+""",
+}
+
+RELATIONSHIP_SECTIONS = {
+    "涉及被害人": """
+#### **涉及被害人**
+- **定义**：案件与被害人之间的关系。
+- **方向**：`案件 -> 人物` 或 `案件 -> 机构`。
+- **属性**：
+  - 无。
+""",
+    "涉及嫌疑人": """
+#### **涉及嫌疑人**
+- **定义**：案件与嫌疑人或被告人之间的关系。
+- **方向**：`案件 -> 人物` 或 `案件 -> 机构`。
+- **属性**：
+  - 无。
+""",
+    "属于组织": """
+#### **属于组织**（可缺失）
+- **定义**：人物隶属于某个机构的关系。
+- **方向**：`人物 -> 机构`。
+- **属性**：
+  - `career`：人物在机构中的职位，字符串类型。
+""",
+    "所在地": """
+#### **所在地**（可缺失）
+- **定义**：人物或机构所在的地理位置。
+- **方向**：`人物 -> 地点` 或 `机构 -> 地点`。
+- **属性**：
+  - 无。
+""",
+    "案发地点": """
+#### **案发地点**（可缺失）
+- **定义**：案件发生的位置。
+- **方向**：`案件 -> 地点`。
+- **属性**：
+  - 无。
+""",
+    "触犯法律法规": """
+#### **触犯法律法规**（可缺失）
+- **定义**：人物或机构违反的法律法规。
+- **方向**：`人物 -> 法律法规` 或 `机构 -> 法律法规`。
+- **属性**：
+  - 无。
+""",
+    "诈骗类型": """
+#### **诈骗类型**（不可缺失！！）
+- **定义**：案件所属的诈骗类型。
+- **方向**：`案件 -> 诈骗类型`。
+- **属性**：
+  - 无。
+""",
+    "涉案工具": """
+#### **涉案工具**
+- **定义**：案件中使用的工具。
+- **方向**：`案件 -> 工具`。
+- **属性**：
+  - 无。
+""",
+    "人物关系": """
+#### **人物关系**（可缺失）
+- **定义**：人物之间的关联。
+- **方向**：`人物 -> 人物`。
+- **属性**：
+  - `type`：分类标签，字符串类型，可以为：`家人`、`朋友`、`同伙`、`其他` 等。（不可缺失）
+""",
+    "涉案资产": """
+#### **涉案资产**（不可缺失！！）
+- **定义**：案件中涉及的资产。
+- **方向**：`案件 -> 实体资产`。
+- **属性**：
+  - 无。
+""",
+    "罪名": """
+#### **罪名**（不可缺失！！）
+- **定义**：人物或机构被指控的罪名。
+- **方向**：`人物 -> 罪名` 或 `机构 -> 罪名`。
+- **属性**：
+  - 无。
+""",
+    "刑事判决": """
+#### **刑事判决**（可缺失）
+- **定义**：案件对人物或机构的判决结果。
+- **方向**：`案件 -> 人物` 或 `案件 -> 机构`。
+- **属性**：
+  - `type`：分类标签，字符串类型，可以为：`缓刑`、`有期徒刑`、`无期徒刑`、`死刑`、`罚款`。（不可缺失）
+  - `刑期`：刑罚的时长，duration 类型，如 `duration({years:2, months:5})`。（可缺失）
+  - `罚金`：罚款金额，数值类型（单位为元）。（可缺失）
+""",
+    "赔偿量": """
+#### **赔偿量**（可缺失）
+- **定义**：人物或机构需要赔偿的资产。
+- **方向**：`人物 -> 实体资产` 或 `机构 -> 实体资产`。
+- **属性**：
+  - 无。
+""",
+    "赔偿给": """
+#### **赔偿给**（可缺失）
+- **定义**：资产赔偿的对象。
+- **方向**：`实体资产 -> 人物` 或 `实体资产 -> 机构`。
+- **属性**：
+  - 无。
+""",
+}
+
+EXAMPLES = [
+    (
+        "数据库中有多少案例？",
+        """
+MATCH (c:案件)
+RETURN count(c) AS case_count
+""",
+    ),
+    (
+        "使用手机诈骗的案例有哪些？",
+        """
+MATCH (c:案件)-[r:涉案工具]->(t:工具)
+WHERE t.name CONTAINS '手机' OR t.type = '手机'
+RETURN c.name AS case_name, c.description AS case_description
+LIMIT 8
+""",
+    ),
+    (
+        "有哪些人涉及到了虚假投资？",
+        """
+MATCH (c:案件)-[r:诈骗类型]->(t:诈骗类型)
+WHERE t.name CONTAINS '投资' OR t.subtype CONTAINS '投资'
+MATCH (c)-[r:涉案嫌疑人]->(p:人物)
+RETURN p.name AS person_name, p.description AS person_description
+LIMIT 8
+""",
+    ),
+    (
+        "涉案金额最多的几个案例",
+        """
+MATCH (c:案件)-[r:涉案资产]->(a:实体资产)
+WHERE a.type = '钱财' AND a.unit = '元'
+RETURN c.name AS caseName, SUM(a.amount) AS totalAmount
+ORDER BY totalAmount DESC
+LIMIT 8
+""",
+    ),
+    (
+        "使用各类工具的诈骗案例分别占比多少？",
+        """
+MATCH (case:案件)-[:涉案工具]->(tool:工具)
+WITH tool.type AS tool_type, count(case) AS case_count
+MATCH (all_case:案件)
+WITH tool_type, case_count, count(all_case) AS total_cases
+RETURN tool_type, toFloat(case_count) / toFloat(total_cases) * 100 AS percentage
+ORDER BY percentage DESC
+LIMIT 8
+""",
+    ),
+    (
+        "涉嫌团伙作案的案件有哪些？",
+        """
+MATCH (c:案件)-[r:涉案嫌疑人]->(p:人物)
+WITH c, count(p) AS suspect_count
+WHERE suspect_count > 1
+RETURN c.name AS case_name, c.description AS case_description
+""",
+    ),
+    (
+        "与嫖娼有关的案件有哪些？",
+        """
+MATCH (c:案件)
+WHERE c.description CONTAINS '嫖' OR c.content CONTAINS '娼'
+RETURN c.name AS case_name, c.description AS case_description
+""",
+    ),
+]
+
+PROVINCES = (
+    "北京", "天津", "上海", "重庆", "河北", "山西", "辽宁", "吉林", "黑龙江", "江苏", "浙江", "安徽", "福建", "江西",
+    "山东", "河南", "湖北", "湖南", "广东", "海南", "四川", "贵州", "云南", "陕西", "甘肃", "青海", "台湾", "内蒙古",
+    "广西", "西藏", "宁夏", "新疆", "香港", "澳门",
+)
+# 问题中出现这些词时保留对应的节点类型
+NODE_TERMS = {
+    "案件": ("案件", "案例", "案子"),
+    "人物": ("人物", "嫌疑人", "被害人", "受害人", "被告", "哪些人", "团伙", "同伙"),
+    "机构": ("机构", "公司", "企业", "组织", "单位"),
+    "地点": ("地点", "地区", "地方", "哪里", "省", "市", "区", "县", *PROVINCES),
+    "工具": ("工具", "手机", "银行卡", "社交软件", "短信", "微信", "QQ", "网站", "APP", "App", "app"),
+    "诈骗类型": ("诈骗类型", "类型", "手法", "投资", "冒充", "刷单", "贷款", "网购", "理财", "退款"),
+    "实体资产": ("资产", "金额", "钱", "元", "房产", "车辆", "股票", "赔偿"),
+    "罪名": ("罪名", "罪"),
+    "法律法规": ("法律", "法规", "条款", "刑法", "民法"),
+}
+# 问题中出现这些词时保留对应的关系类型
+RELATIONSHIP_TERMS = {
+    "涉及被害人": ("被害人", "受害人", "受害者"),
+    "涉及嫌疑人": ("嫌疑人", "被告", "哪些人", "团伙", "同伙"),
+    "属于组织": ("属于", "任职", "员工"),
+    "所在地": ("所在地", "住在", "位于"),
+    "案发地点": ("案发", "发生", "哪里", "地区", *PROVINCES),
+    "触犯法律法规": ("触犯", "违反", "法律", "法规"),
+    "诈骗类型": ("诈骗类型", "类型", "手法"),
+    "涉案工具": ("工具", "使用"),
+    "人物关系": ("关系", "家人", "朋友", "同伙", "团伙"),
+    "涉案资产": ("资产", "金额", "涉案"),
+    "罪名": ("罪名", "罪"),
+    "刑事判决": ("判决", "判处", "刑期", "有期徒刑", "缓刑", "罚金", "罚款"),
+    "赔偿量": ("赔偿",),
+    "赔偿给": ("赔偿",),
+}
+
+DIRECTION_PATTERN = re.compile(r"`(\S+) -> (\S+)`")
+NODE_LABEL_PATTERN = re.compile(r"\(\w*\s*:\s*`?(\w+)")
+RELATIONSHIP_TYPE_PATTERN = re.compile(r"\[\w*\s*:\s*`?(\w+)")
+
+# 从手写 schema 的“方向”中解析关系两端的节点类型
+RELATIONSHIP_ENDPOINTS = {
+    name: DIRECTION_PATTERN.findall(section.split("**方向**", 1)[1].split("\n", 1)[0])
+    for name, section in RELATIONSHIP_SECTIONS.items()
+}
+
+
+def _bigrams(text):
+    text = re.sub(r"\s+", "", text)
+    return Counter(text[i:i + 2] for i in range(len(text) - 1))
+
+
+def _cosine(a, b):
+    dot = sum(count * b[gram] for gram, count in a.items() if gram in b)
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+
+class ExampleSelector:
+    """按字符二元组余弦相似度从示例库中挑选与问题最相近的示例"""
+
+    def __init__(self, examples=EXAMPLES):
+        self.examples = [(question, cypher.strip()) for question, cypher in examples]
+        self.vectors = [_bigrams(question) for question, _ in self.examples]
+
+    def select(self, question, k=3):
+        """返回最相近的 k 个示例，与问题没有共同二元组的示例不返回（至少返回一个）"""
+        vector = _bigrams(question)
+        scores = [_cosine(vector, example) for example in self.vectors]
+        ranked = sorted(range(len(self.examples)), key=lambda i: scores[i], reverse=True)[:k]
+        return [self.examples[i] for n, i in enumerate(ranked) if n == 0 or scores[i] > 0]
+
+
+def touched_types(question, examples):
+    """问题与所选示例涉及的节点类型与关系类型"""
+    cypher = "\n".join(c for _, c in examples)
+    labels = {"案件"} | {label for label, terms in NODE_TERMS.items() if any(term in question for term in terms)}
+    labels |= set(NODE_LABEL_PATTERN.findall(cypher)) & NODE_SECTIONS.keys()
+    types = {name for name, terms in RELATIONSHIP_TERMS.items() if any(term in question for term in terms)}
+    types |= set(RELATIONSHIP_TYPE_PATTERN.findall(cypher)) & RELATIONSHIP_SECTIONS.keys()
+    # 关系两端的节点类型也要保留，取该关系的第一种方向
+    for name in types:
+        labels.update(RELATIONSHIP_ENDPOINTS[name][0])
+    # 连接已选节点类型的关系
+    types |= {
+        name for name, endpoints in RELATIONSHIP_ENDPOINTS.items()
+        if any(start in labels and end in labels for start, end in endpoints)
+    }
+    return labels, types
+
+
+def format_structured_schema(structured_schema, labels=None, types=None):
+    """把 Neo4jGraph.structured_schema 格式化为文本，可只保留给定的节点类型与关系类型"""
+    def keep(name, allowed):
+        return allowed is None or name in allowed
+
+    def props(items):
+        return ", ".join(f"{item['property']}: {item['type']}" for item in items)
+
+    node_props = structured_schema.get("node_props", {})
+    rel_props = structured_schema.get("rel_props", {})
+    relationships = structured_schema.get("relationships", [])
+    lines = ["Node properties:"]
+    lines += [f"{label} {{{props(items)}}}" for label, items in node_props.items() if keep(label, labels)]
+    lines.append("Relationship properties:")
+    lines += [f"{name} {{{props(items)}}}" for name, items in rel_props.items() if keep(name, types)]
+    lines.append("The relationships:")
+    lines += [
+        f"(:{rel['start']})-[:{rel['type']}]->(:{rel['end']})"
+        for rel in relationships
+        if keep(rel["type"], types) and keep(rel["start"], labels) and keep(rel["end"], labels)
+    ]
+    return "\n".join(lines)
+
+
+def render_context(node_sections, relationship_sections, examples, schema):
+    """拼出提示词中 {schema} 的内容：手写 schema、示例与内省的 schema"""
+    examples_text = "\n\n".join(
+        f"{i}. {question}\n```cypher\n{cypher}\n```" for i, (question, cypher) in enumerate(examples, 1)
+    )
+    return "\n\n".join([
+        "## **反诈骗知识图谱数据模式**",
+        "### **节点类型 (Node Type)**",
+        "\n\n".join(section.strip() for section in node_sections),
+        "---",
+        "### **关系类型 (Relationship Type)**",
+        "\n\n".join(section.strip() for section in relationship_sections),
+        "Example Cypher Statements:",
+        examples_text,
+        f"Schema:\n{schema}",
+    ])
+
+
+def full_context(structured_schema=None):
+    """不做任何筛选的完整内容，与拆分前的提示词一致，用于对比 token 数"""
+    return render_context(
+        NODE_SECTIONS.values(),
+        RELATIONSHIP_SECTIONS.values(),
+        [(question, cypher.strip()) for question, cypher in EXAMPLES],
+        format_structured_schema(structured_schema or {}),
+    )
+
+
+_selector = ExampleSelector()
+
+
+def select_context(question, structured_schema=None, k=3):
+    """按问题挑选 k 个示例，只保留问题与示例涉及的 schema 片段"""
+    examples = _selector.select(question, k=k)
+    labels, types = touched_types(question, examples)
+    return render_context(
+        [section for name, section in NODE_SECTIONS.items() if name in labels],
+        [section for name, section in RELATIONSHIP_SECTIONS.items() if name in types],
+        examples,
+        format_structured_schema(structured_schema or {}, labels, types),
+    )
@@ -78,6 +78,14 @@ with st.sidebar:
             {"role": "assistant", "content": "你好，我是关于反诈知识的问答助手。有什么可以帮助到你？🥰"},
         ]
         st.success('会话已重置', icon='✅')
+
+    with st.expander("📈 运行状态"):
+        from bot.tools.cypher_cache import init_cypher_cache
+        st.markdown("**Cypher 缓存**")
+        st.json(init_cypher_cache().stats())
+        from bot.router import init_router
+        st.markdown("**问题路由**")
+        st.json(init_router().stats())
     
     with st.expander("⚙️ 高级选项"):
             st.header("DeepSeek API Key 配置")
@@ -93,12 +101,14 @@ with st.sidebar:
                 st.session_state.openai_base_url = st.secrets['OPENAI_BASE_URL']
             
             if st.button('检查 API Key 可用性'):
-                import openai
+                import llm_gateway
                 with st.spinner('正在验证...'):
                     try:
-                        openai.base_url = st.session_state.openai_base_url
-                        openai.api_key = st.session_state.openai_api_key
-                        openai.models.retrieve(st.session_state.openai_model)
+                        llm_gateway.check_model(
+                            st.session_state.openai_api_key,
+                            st.session_state.openai_base_url,
+                            st.session_state.openai_model,
+                        )
                         st.success('API Key 验证成功', icon='✅')
                     except Exception as e:
                         st.error(e, icon='❌')
@@ -146,7 +156,26 @@ def handle_submit(message):
         # Call the agent
         # response = generate_response(message)
         # write_message('assistant', response)
-        from bot.agent import generate_response_stream
+        from bot import precompute
+        precomputed = precompute.lookup(message)
+        if precomputed is not None:
+            # 示例问题直接展示预计算的答案，并写入会话历史，便于继续追问
+            from bot.agent import get_memory
+            from bot.utils import get_session_id
+            history = get_memory(get_session_id())
+            history.add_user_message(message)
+            history.add_ai_message(precomputed["answer"])
+            write_message('assistant', precomputed["answer"])
+            return
+
+        # 意图明确的问题由本地路由直接调用工具，其余问题交给智能体
+        from bot.agent import generate_fast_response, generate_response_stream
+        with st.spinner("正在生成内容……"):
+            answer = generate_fast_response(message)
+        if answer is not None:
+            write_message('assistant', answer)
+            return
+
         response_stream = generate_response_stream(message)
         write_message('assistant', response_stream)
             
@@ -178,3 +207,13 @@ if question := st.chat_input("键入新问题……") or asked_example:
 
     # Generate a response
     handle_submit(question)
+
+@st.cache_resource(show_spinner=False, ttl=3600)
+def refresh_precomputed_answers():
+    """每个进程每小时最多检查一次示例问题的预计算答案，过期时在后台重新计算"""
+    from bot import precompute
+    return precompute.refresh_if_stale(EXAMPLE_QUESTIONS)
+
+
+# 页面渲染完成后检查，知识图谱更新后在后台重新计算
+refresh_precomputed_answers()
@@ -0,0 +1,200 @@
+"""
+进程级的大模型调用网关。
+
+所有页面与问答助手共用一个带连接池的 httpx 客户端，连接保持 keep-alive，
+不必每次调用都重新建立 TLS 连接；同时进行的上游请求数受 max_concurrency 限制。
+内容完全相同且仍在进行中的流式请求只发送一次，上游返回的每个片段分发给所有等待者。
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import httpx
+import streamlit as st
+from openai import OpenAI
+
+
+class _Flight:
+    """一次进行中的上游流式请求，片段缓存在 chunks 中供所有订阅者按顺序读取"""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.condition = threading.Condition()
+
+
+class _Subscription:
+    """
+    订阅者按顺序读取片段的迭代器。
+
+    读完、调用 close() 或被回收时退订；所有订阅者都退订后，上游请求提前结束。
+    """
+
+    def __init__(self, flight):
+        self.flight = flight
+        self.index = 0
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        flight = self.flight
+        if self.closed:
+            raise StopIteration
+        with flight.condition:
+            while self.index >= len(flight.chunks) and not flight.done:
+                flight.condition.wait()
+            if self.index < len(flight.chunks):
+                self.index += 1
+                return flight.chunks[self.index - 1]
+        self.close()
+        if flight.error is not None:
+            raise flight.error
+        raise StopIteration
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            with self.flight.condition:
+                self.flight.subscribers -= 1
+
+    __del__ = close
+
+
+class LLMGateway:
+    """
+    max_clients 为保留的 OpenAI 客户端数（按 API Key 与 Base URL 区分），
+    用户可以自定义这两项，超出时淘汰最久未使用的客户端；transport 供测试替换 httpx 的传输层。
+    """
+
+    def __init__(self, max_connections=20, max_concurrency=8, timeout=60.0, keepalive_expiry=30.0,
+                 max_clients=16, transport=None):
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(timeout, connect=10.0),
+            transport=transport,
+        )
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.lock = threading.Lock()
+        self.max_clients = max_clients
+        self.clients = OrderedDict()
+        self.inflight = {}
+        self.requests = 0
+        self.upstream = 0
+        self.active = 0
+
+    def client(self, api_key, base_url):
+        """共用连接池的 OpenAI 客户端，相同的 API Key 与 Base URL 复用同一个实例"""
+        with self.lock:
+            key = (api_key, base_url)
+            if key not in self.clients:
+                self.clients[key] = OpenAI(api_key=api_key, base_url=base_url, http_client=self.http_client)
+                # 客户端共用 http_client，淘汰时不必关闭
+                while len(self.clients) > self.max_clients:
+                    self.clients.popitem(last=False)
+            self.clients.move_to_end(key)
+            return self.clients[key]
+
+    def _pump(self, key, flight, client, request):
+        with self.semaphore:
+            with self.lock:
+                self.active += 1
+            try:
+                stream = client.chat.completions.create(**request, stream=True)
+                try:
+                    for chunk in stream:
+                        if not chunk.choices or not chunk.choices[0].delta.content:
+                            continue
+                        with flight.condition:
+                            # 所有订阅者都已离开时不再读取上游
+                            if flight.subscribers == 0:
+                                break
+                            flight.chunks.append(chunk.choices[0].delta.content)
+                            flight.condition.notify_all()
+                finally:
+                    stream.close()
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self.lock:
+                    self.active -= 1
+                    if self.inflight.get(key) is flight:
+                        del self.inflight[key]
+                with flight.condition:
+                    flight.done = True
+                    flight.condition.notify_all()
+
+    def stream_chat(self, messages, model, api_key, base_url, **params):
+        """
+        流式对话补全，返回逐段产出文本的迭代器，可直接交给 st.write_stream。
+
+        与仍在进行中的相同请求合并，后加入的订阅者会先收到已经到达的片段。
+        """
+        request = {"model": model, "messages": messages, **params}
+        key = hashlib.sha256(
+            json.dumps([api_key, base_url, request], ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        with self.lock:
+            self.requests += 1
+            flight = self.inflight.get(key)
+            # 所有订阅者都已离开的请求会被提前结束，不能再加入
+            leader = flight is None or flight.subscribers == 0
+            if leader:
+                flight = self.inflight[key] = _Flight()
+                self.upstream += 1
+            with flight.condition:
+                flight.subscribers += 1
+        if leader:
+            threading.Thread(
+                target=self._pump,
+                args=(key, flight, self.client(api_key, base_url), request),
+                name="llm-gateway-stream",
+                daemon=True,
+            ).start()
+        return _Subscription(flight)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "upstream_requests": self.upstream,
+                "coalesced": self.requests - self.upstream,
+                "in_flight": len(self.inflight),
+                "active": f"{self.active}/{self.max_concurrency}",
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def init_llm_gateway():
+    """所有页面共享的网关实例"""
+    return LLMGateway(
+        max_connections=st.secrets.get("LLM_MAX_CONNECTIONS", 20),
+        max_concurrency=st.secrets.get("LLM_MAX_CONCURRENCY", 8),
+        timeout=st.secrets.get("LLM_TIMEOUT", 60.0),
+        max_clients=st.secrets.get("LLM_MAX_CLIENTS", 16),
+    )
+
+
+def stream_chat(messages, **params):
+    """使用当前会话的 API Key、模型与 Base URL 发起流式对话"""
+    return init_llm_gateway().stream_chat(
+        messages,
+        model=st.session_state.openai_model,
+        api_key=st.session_state.openai_api_key,
+        base_url=st.session_state.openai_base_url,
+        **params,
+    )
+
+
+def check_model(api_key, base_url, model):
+    """验证 API Key 能否访问指定模型，失败时抛出异常"""
+    init_llm_gateway().client(api_key, base_url).models.retrieve(model)
@@ -0,0 +1,84 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_CJK = re.compile(r"[一-鿿　-〿＀-￯]")
+
+
+def estimate_tokens(text):
+    """粗略估算 token 数：中文字符约 0.6 个 token，其他字符约 0.3 个"""
+    cjk = len(_CJK.findall(text))
+    return round(cjk * 0.6 + (len(text) - cjk) * 0.3)
+
+
+class AdviceCache:
+    """
+    大模型建议缓存：有界 LRU，条目超过 ttl 秒后失效。
+
+    缓存键由调用方给出，例如 (类别, 风险等级, 近重复簇, 提示词版本)。
+    保存的是生成时的文本片段，命中时按原片段顺序回放，页面上的流式效果保持不变。
+    """
+
+    def __init__(self, capacity=2000, ttl=86400, replay_delay=0.005):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.replay_delay = replay_delay
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.tokens_saved += entry[2]
+            return entry[1]
+
+    def put(self, key, chunks):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), list(chunks), estimate_tokens("".join(chunks)))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def _replay(self, chunks):
+        for chunk in chunks:
+            yield chunk
+            time.sleep(self.replay_delay)
+
+    def _record(self, key, stream):
+        chunks = []
+        for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        # 只缓存完整生成的建议，中途出错或被打断时不保存
+        if chunks:
+            self.put(key, chunks)
+
+    def stream(self, key, generate):
+        """命中时回放缓存的片段，否则调用 generate() 流式生成并在结束后写入缓存"""
+        chunks = self.get(key)
+        if chunks is not None:
+            return self._replay(chunks)
+        return self._record(key, generate())
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "estimated_tokens_saved": self.tokens_saved,
+            }
@@ -0,0 +1,177 @@
+"""
+MsgClsModel 推理性能基准测试。
+
+用法：
+    python -m recognize.benchmark --output bench.json
+    python -m recognize.benchmark --backends torch onnx --threads 1 4 --batch-sizes 1 8 32
+
+测试冷启动耗时、单条短信延迟（p50/p95/p99），以及不同批大小、序列长度、
+线程数下的吞吐量。测试文本由 recognize/fraud_keywords.json 中的关键词合成，
+不依赖私有数据集。结果以 JSON 输出，便于在不同版本之间对比。
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+TEMPLATES = [
+    "【{brand}】尊敬的客户，您的{w1}存在异常，请{urgent}{w2}以下{w3}完成处理，",
+    "您好，我是{brand}客服，您有一笔{w1}待{w2}，{urgent}联系我们{w3}，",
+    "恭喜您获得{brand}{w1}资格，{urgent}{w2}即可{w3}，名额有限，",
+    "{brand}提醒：您的{w1}将于今日到期，请{urgent}{w2}并{w3}，逾期将影响使用，",
+]
+BRANDS = ["顺丰", "京东", "淘宝", "工商银行", "支付宝", "抖音", "中国移动"]
+URGENT = ["立即", "马上", "尽快", "赶快", "现在"]
+
+
+def synthetic_messages(n, length, keywords_path="recognize/fraud_keywords.json", seed=0):
+    """用关键词词表合成 n 条约 length 个字的中文诈骗短信"""
+    with open(keywords_path, "r", encoding="utf-8") as f:
+        words = [word for word, _ in json.load(f)][:200]
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(n):
+        text = ""
+        while len(text) < length:
+            text += rng.choice(TEMPLATES).format(
+                brand=rng.choice(BRANDS),
+                urgent=rng.choice(URGENT),
+                w1=rng.choice(words),
+                w2=rng.choice(words),
+                w3=rng.choice(words),
+            )
+        messages.append(text[:length])
+    return messages
+
+
+def available_backends():
+    import torch
+    backends = ["torch"]
+    try:
+        import onnxruntime  # noqa: F401
+        backends.append("onnx")
+    except ImportError:
+        pass
+    if any(engine != "none" for engine in torch.backends.quantized.supported_engines):
+        backends.append("int8")
+    return backends
+
+
+def percentiles(samples):
+    cuts = statistics.quantiles(samples, n=100)
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98], "mean": statistics.fmean(samples)}
+
+
+def _cold_start(backend, results):
+    start = time.perf_counter()
+    from recognize.fraud_msg_cls import MsgClsModel
+    imported = time.perf_counter()
+    model = MsgClsModel(backend=backend)
+    loaded = time.perf_counter()
+    model.predict("冷启动测试短信，请忽略。")
+    ready = time.perf_counter()
+    results.put({"import_s": imported - start, "load_s": loaded - imported, "first_predict_s": ready - loaded,
+                 "total_s": ready - start})
+
+
+def cold_start(backend):
+    """在全新的进程中测量 import、加载权重与首次推理的耗时"""
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    proc = ctx.Process(target=_cold_start, args=(backend, results))
+    proc.start()
+    result = results.get()
+    proc.join()
+    return result
+
+
+def single_latency(model, messages, warmup=5):
+    for text in messages[:warmup]:
+        model.predict(text)
+    samples = []
+    for text in messages:
+        start = time.perf_counter()
+        model.predict(text)
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+
+
+def throughput(model, messages, batch_size):
+    model.predict_batch(messages[:batch_size], batch_size=batch_size)
+    start = time.perf_counter()
+    model.predict_batch(messages, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    return {"messages_per_s": len(messages) / elapsed, "batch_ms": elapsed * 1000 / -(-len(messages) // batch_size)}
+
+
+def run(args):
+    import torch
+    from recognize.fraud_msg_cls import MsgClsModel
+
+    backends = args.backends or available_backends()
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "cpu_count": os.cpu_count(),
+            "cuda": torch.cuda.is_available(),
+        },
+        "cold_start": {},
+        "latency": [],
+        "throughput": [],
+    }
+    latency_messages = synthetic_messages(args.latency_samples, 64, seed=1)
+    for backend in backends:
+        print(f"[{backend}] cold start", file=sys.stderr)
+        report["cold_start"][backend] = cold_start(backend)
+        for threads in args.threads:
+            model = MsgClsModel(backend=backend, num_threads=threads)
+            print(f"[{backend}] threads={threads} latency", file=sys.stderr)
+            report["latency"].append(
+                {"backend": backend, "threads": threads, **single_latency(model, latency_messages)}
+            )
+            for seq_len in args.seq_lens:
+                # 合成文本按字数截断，bert-base-chinese 基本是一字一 token，扣除 [CLS] 与 [SEP]
+                messages = synthetic_messages(args.messages, max(seq_len - 2, 1), seed=seq_len)
+                for batch_size in args.batch_sizes:
+                    print(f"[{backend}] threads={threads} seq_len={seq_len} batch_size={batch_size}", file=sys.stderr)
+                    report["throughput"].append({
+                        "backend": backend,
+                        "threads": threads,
+                        "seq_len": seq_len,
+                        "batch_size": batch_size,
+                        **throughput(model, messages, batch_size),
+                    })
+            del model
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="*", help="默认测试所有可用后端")
+    parser.add_argument("--threads", nargs="*", type=int, default=[1, max(1, (os.cpu_count() or 2) // 2)])
+    parser.add_argument("--batch-sizes", nargs="*", type=int, default=[1, 2, 4, 8, 16, 32, 64, 128])
+    parser.add_argument("--seq-lens", nargs="*", type=int, default=[16, 32, 64, 128])
+    parser.add_argument("--messages", type=int, default=256, help="每组吞吐量测试的短信条数")
+    parser.add_argument("--latency-samples", type=int, default=200)
+    parser.add_argument("--output", help="结果 JSON 文件，默认输出到标准输出")
+    args = parser.parse_args()
+
+    report = run(args)
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(data)
+    else:
+        print(data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+离线批量打分：对 JSONL / CSV 短信导出文件逐行识别。
+
+用法：
+    python -m recognize.bulk_score dump.jsonl scores.jsonl --text-field content
+    python -m recognize.bulk_score dump.csv scores.jsonl --workers 8 --backend onnx
+
+分词、规则特征与近重复检测用的 MinHash 签名在进程池中计算，
+模型推理与近重复簇的分配在主进程中按批进行。
+输入按块流式读取，内存占用与文件大小无关；每写完一块都会记录检查点（输入与输出文件的字节位置），
+中断后以相同参数重新运行即可直接定位到上次完成的位置继续，不必重新解析已处理的行。
+近重复簇只在一次运行的内存中：恢复后簇编号从检查点记录的下一个编号继续，不会与之前的编号重复，
+但恢复前的簇不会保留，同一批短信在恢复点前后会分属不同编号的簇。
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+_tokenizer = None
+_extractor = None
+_max_length = 128
+_num_perm = None
+
+
+def _init_worker(keywords_path, max_length, num_perm=None):
+    global _tokenizer, _extractor, _max_length, _num_perm
+    from transformers import BertTokenizer
+    from recognize.features import FeatureExtractor
+    with open(keywords_path, "r", encoding="utf-8") as f:
+        keywords = json.load(f)
+    _tokenizer = BertTokenizer.from_pretrained('bert-base-chinese')
+    _extractor = FeatureExtractor([word for word, _ in keywords])
+    _max_length = max_length
+    _num_perm = num_perm
+
+
+def _prepare(texts):
+    """在工作进程中完成分词、规则特征与 MinHash 签名的计算，未开启近重复检测时签名为 None"""
+    from recognize.near_dup import sketch
+    encoded = _tokenizer(texts, truncation=True, max_length=_max_length)
+    encodings = [{key: encoded[key][i] for key in encoded.keys()} for i in range(len(texts))]
+    if _num_perm is None:
+        signatures = [None] * len(texts)
+    else:
+        signatures = [sketch(text, _num_perm) for text in texts]
+    return encodings, _extractor.extract_batch(texts), signatures
+
+
+class _Lines:
+    """按行解码二进制文件，并记录已读取的字节数，供检查点定位"""
+
+    def __init__(self, f):
+        self.f = f
+        self.position = f.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.f.readline()
+        if not line:
+            raise StopIteration
+        self.position += len(line)
+        return line.decode("utf-8")
+
+
+def read_rows(path, text_field, start_row=0, start_byte=0):
+    """
+    逐行读取输入文件，产出 (行号, 原始行, 文本, 该行之后的字节位置)。
+
+    start_byte 为检查点中记录的字节位置，从这里直接继续读取，行号从 start_row 开始。
+    """
+    with open(path, "rb") as f:
+        lines = _Lines(f)
+        if path.endswith(".csv"):
+            # csv 模块按需读取行，产出一条记录时恰好读完它所在的行，字节位置即为记录的结尾
+            fieldnames = next(csv.reader(lines))
+            if start_byte:
+                f.seek(start_byte)
+                lines.position = start_byte
+            rows = csv.DictReader(lines, fieldnames=fieldnames)
+        else:
+            f.seek(start_byte)
+            lines.position = start_byte
+            rows = (json.loads(line) for line in lines if line.strip())
+        for offset, row in enumerate(rows, start_row):
+            yield offset, row, str(row.get(text_field) or ""), lines.position
+
+
+def load_checkpoint(output):
+    path = output + ".ckpt"
+    if not os.path.exists(path):
+        return {"rows": 0, "bytes": 0, "input_bytes": 0, "next_cluster": 1}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(output, rows, size, input_bytes, next_cluster):
+    path = output + ".ckpt"
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"rows": rows, "bytes": size, "input_bytes": input_bytes, "next_cluster": next_cluster}, f)
+    os.replace(path + ".tmp", path)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def score(args):
+    from recognize.fraud_msg_cls import MsgClsModel
+    from recognize.features import get_risk_level
+    from recognize.near_dup import NearDupIndex
+
+    model = MsgClsModel(backend=args.backend)
+    checkpoint = load_checkpoint(args.output)
+    if not os.path.exists(args.output) or "input_bytes" not in checkpoint:
+        # 没有输出文件或检查点来自不记录输入位置的旧版本时从头开始
+        checkpoint = {"rows": 0, "bytes": 0, "input_bytes": 0, "next_cluster": 1}
+    done = checkpoint["rows"]
+    if done:
+        print(f"Resuming from row {done}")
+
+    # 截掉上次中断时可能写了一半的内容
+    out = open(args.output, "r+b" if done else "wb")
+    out.seek(checkpoint["bytes"])
+    out.truncate()
+
+    index = NearDupIndex(capacity=args.near_dup_capacity, first_id=checkpoint["next_cluster"]) if args.near_dup else None
+
+    def classify(chunk, encodings, signatures):
+        if index is None:
+            return model.predict_encoded(encodings, batch_size=args.batch_size), [None] * len(chunk)
+        # 只对每个新簇的代表短信做推理，簇内其他短信复用其结果
+        clusters = [index.assign(text, signature) for (_, _, text, _), signature in zip(chunk, signatures)]
+        pending = {}
+        for i, cluster in enumerate(clusters):
+            if cluster.prediction is None and cluster.id not in pending:
+                pending[cluster.id] = i
+        if pending:
+            predictions = model.predict_encoded([encodings[i] for i in pending.values()], batch_size=args.batch_size)
+            for i, preds in zip(pending.values(), predictions):
+                clusters[i].prediction = preds
+        return [cluster.prediction for cluster in clusters], [cluster.id for cluster in clusters]
+
+    def write_chunk(chunk, future):
+        nonlocal done
+        encodings, features, signatures = future.result()
+        predictions, cluster_ids = classify(chunk, encodings, signatures)
+        for (offset, row, _, _), preds, feats, cluster_id in zip(chunk, predictions, features, cluster_ids):
+            category, prob = preds[0]
+            record = {
+                "offset": offset,
+                **row,
+                "prediction": category,
+                "probability": float(prob),
+                "风险等级": get_risk_level(category, prob),
+                **feats,
+            }
+            if cluster_id is not None:
+                record["cluster"] = cluster_id
+            out.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        out.flush()
+        os.fsync(out.fileno())
+        done += len(chunk)
+        save_checkpoint(args.output, done, out.tell(), chunk[-1][3], index.next_id if index is not None else 1)
+
+    rows = read_rows(args.input, args.text_field, done, checkpoint["input_bytes"])
+    start, resumed_from = time.perf_counter(), done
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(args.keywords, model.max_length, index.num_perm if index is not None else None),
+    ) as pool, out:
+        # 在途的块数有上限，读入速度不会超过推理速度太多
+        pending = deque()
+        for chunk in chunked(rows, args.chunk_size):
+            pending.append((chunk, pool.submit(_prepare, [text for _, _, text, _ in chunk])))
+            if len(pending) >= args.workers * 2:
+                write_chunk(*pending.popleft())
+        while pending:
+            write_chunk(*pending.popleft())
+
+    elapsed = time.perf_counter() - start
+    scored = done - resumed_from
+    print(f"Scored {scored} rows in {elapsed:.1f}s ({scored / max(elapsed, 1e-9):.1f} rows/sec), {done} rows total")
+    if index is not None:
+        print(f"Near-duplicate clusters: {index.stats()}")
+        for cluster in index.top_clusters(args.top_clusters):
+            print(f"  #{cluster['id']} x{cluster['size']}: {cluster['example'][:60]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="输入文件（.jsonl 或 .csv）")
+    parser.add_argument("output", help="输出 JSONL 文件")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--keywords", default="recognize/fraud_keywords.json")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--near-dup", action="store_true", help="近似重复的短信复用同簇代表短信的结果")
+    parser.add_argument("--near-dup-capacity", type=int, default=50000)
+    parser.add_argument("--top-clusters", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    score(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import hashlib
+import os
+import time
+
+import requests
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_complete(response, part_path, sha256):
+    """服务器返回 416 时确认 .part 确实是完整的文件，而不是截断或损坏的残留"""
+    if sha256:
+        return file_sha256(part_path) == sha256.lower()
+    # 没有给出校验和时，对比 Content-Range 中的文件总长度
+    total = response.headers.get("Content-Range", "").rpartition("/")[2]
+    return total.isdigit() and int(total) == os.path.getsize(part_path)
+
+
+def _fetch(url, part_path, chunk_size, timeout, sha256=None):
+    """
+    把 url 的内容续写到 part_path，服务器支持 Range 时从已下载的位置继续。
+
+    返回 True 表示 part_path 已在这里通过校验，调用方无需再次计算校验和。
+    """
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if offset and response.status_code == 416:
+            if _is_complete(response, part_path, sha256):
+                return bool(sha256)
+            restart = True
+        else:
+            restart = False
+            response.raise_for_status()
+            mode = "ab" if offset and response.status_code == 206 else "wb"
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+    if restart:
+        # 已下载的部分无法通过校验，从头重新下载
+        os.remove(part_path)
+        return _fetch(url, part_path, chunk_size, timeout, sha256)
+    return False
+
+
+def download_file(url, path, sha256=None, chunk_size=1 << 20, timeout=30, retries=3):
+    """
+    分块流式下载文件。
+
+    数据先写入 path + ".part"，中断后再次调用会通过 HTTP Range 续传；
+    下载完成后校验 SHA-256（若给出），通过后再原子地重命名为 path。
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    part_path = path + ".part"
+    for attempt in range(retries + 1):
+        try:
+            verified = _fetch(url, part_path, chunk_size, timeout, sha256)
+            break
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+            if attempt == retries:
+                raise
+            time.sleep(2 ** attempt)
+    if sha256 and not verified:
+        actual = file_sha256(part_path)
+        if actual != sha256.lower():
+            os.remove(part_path)
+            raise ValueError(f"Checksum mismatch for {url}: expected {sha256}, got {actual}")
+    os.replace(part_path, path)
+    return path
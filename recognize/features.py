@@ -0,0 +1,55 @@
+import re
+from collections import Counter
+
+import jieba
+
+URL_PATTERN = re.compile(
+    r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+|www\.[^\s]+"
+)
+URGENCY_WORDS = frozenset(["立即", "马上", "尽快", "赶快", "今天", "现在", "机会"])
+STOPWORDS = frozenset(['的', '了', '是', '在', '和', '就', '都', '而', '及', '与', '这', '那', '有'])
+
+
+def get_risk_level(res, prob):
+    """根据概率计算风险等级"""
+    if res == "无风险":
+        return "无风险"
+    elif prob > 0.7:
+        return "高风险"
+    elif prob > 0.5:
+        return "中风险"
+    else:
+        return "低风险"
+
+
+class FeatureExtractor:
+    """
+    短信规则特征提取。
+
+    每条文本只做一次 jieba 分词，词表均为集合，一次调用返回全部规则特征。
+    """
+
+    def __init__(self, keywords, urgency_words=URGENCY_WORDS, stopwords=STOPWORDS):
+        self.keywords = frozenset(keywords)
+        self.urgency_words = frozenset(urgency_words)
+        self.stopwords = frozenset(stopwords)
+
+    def extract(self, text, top_k=3):
+        words = jieba.lcut(text)
+        danger_words = [word for word in words if word in self.keywords]
+        urgency_count = sum(1 for word in words if word in self.urgency_words)
+        url_count = len(URL_PATTERN.findall(text))
+
+        # 展示用关键词：长度 > 1 + 非停用词，按词频排序
+        word_counts = Counter(word for word in danger_words if len(word) > 1 and word not in self.stopwords)
+        top_words = [word for word, _ in word_counts.most_common(top_k)]
+
+        return {
+            "关键词": top_words if top_words else ["无"],
+            "关键词风险": min(len(danger_words) * 20 + 28, 100),  # 每个关键词20%，上限100%
+            "链接风险": min(url_count * 60 + 30, 100),  # 每个链接增加风险，上限100%
+            "紧迫性指数": min(urgency_count * 25 + 32, 100),  # 每个词25%，上限100%
+        }
+
+    def extract_batch(self, texts, top_k=3):
+        return [self.extract(text, top_k=top_k) for text in texts]
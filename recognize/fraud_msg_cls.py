@@ -5,54 +5,350 @@ classes = ['冒充公检法及政府机关类', '冒充军警购物类诈骗', '
 import torch
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 from sklearn.preprocessing import LabelEncoder
-from transformers import BertTokenizer, BertForSequenceClassification
+from transformers import BertConfig, BertTokenizer, BertForSequenceClassification
+import os
+import pickle
 import torch
+from recognize.download import download_file, file_sha256
+
+MODEL_PATH = "model/final_model.pth"
+ONNX_PATH = "model/final_model.onnx"
+INT8_PATH = "model/final_model.int8.pt"
+MODEL_URL = "https://dlink.host/1drv/aHR0cHM6Ly8xZHJ2Lm1zL3UvYy82YWE4YmQ4MzYxZWQ0NTkwL0VYT1F5WktPTnJSUG1vdENncVVodVI4QjZ4MV9uMjVfMDhFTGdlOHNURF9Fcnc_ZT05ZXB4WE4.pth"
+# 发布的 final_model.pth 的 SHA-256，下载后默认按它校验；换用其他权重时在配置中给出 MSG_CLS_MODEL_SHA256
+MODEL_SHA256 = None
+BACKENDS = ("torch", "onnx", "int8")
+ONNX_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+
+def weights_checksum(path=MODEL_PATH):
+    """权重文件的 SHA-256，按文件大小与修改时间缓存在旁路文件中，避免每次启动都重新计算"""
+    stat = os.stat(path)
+    stamp = f"{stat.st_size}:{stat.st_mtime_ns}"
+    sidecar = path + ".sha256"
+    if os.path.exists(sidecar):
+        with open(sidecar, "r") as f:
+            cached = f.read().split()
+        if len(cached) == 2 and cached[0] == stamp:
+            return cached[1]
+    checksum = file_sha256(path)
+    with open(sidecar, "w") as f:
+        f.write(f"{stamp} {checksum}")
+    return checksum
+
+
+def download_model(sha256=None):
+    """
+    权重文件不存在时下载并校验 SHA-256。
+
+    sha256 为 None 时使用固定的 MODEL_SHA256，为 False 时显式跳过校验；
+    没有可用的摘要时拒绝下载，不接受未经校验的权重。
+    """
+    if os.path.exists(MODEL_PATH):
+        return
+    if sha256 is None:
+        sha256 = MODEL_SHA256
+    if sha256 is None:
+        raise RuntimeError(
+            f"No SHA-256 pinned for {MODEL_URL}: set MSG_CLS_MODEL_SHA256, "
+            f"or MSG_CLS_VERIFY_SHA256 = false to skip verification, or place the weights at {MODEL_PATH}"
+        )
+    print("Model not found, downloading...")
+    download_file(MODEL_URL, MODEL_PATH, sha256=sha256 or None)
+
+
+def load_state_dict(path=MODEL_PATH):
+    """读取微调权重，通过 mmap 映射而不是整体读入内存，以降低冷启动耗时和峰值内存"""
+    try:
+        return torch.load(path, map_location=device, mmap=True, weights_only=True)
+    except RuntimeError:
+        # 旧版序列化格式不支持 mmap
+        return torch.load(path, map_location=device, weights_only=True)
+
+
+def load_torch_model(sha256=None):
+    """加载微调后的 PyTorch 模型"""
+    model = BertForSequenceClassification.from_pretrained('bert-base-chinese', num_labels=len(classes)).to(device)
+    download_model(sha256)
+    # Use Huawei Nezha model
+    model.load_state_dict(load_state_dict())
+    if torch.cuda.is_available():
+        model = model.cuda()
+    return model.eval()
+
+
+def build_skeleton():
+    """不做随机初始化的模型结构，参数随后由权重文件替换"""
+    from transformers.modeling_utils import no_init_weights
+    config = BertConfig.from_pretrained('bert-base-chinese', num_labels=len(classes))
+    with no_init_weights():
+        return BertForSequenceClassification(config)
+
+
+def load_shared_torch_model(sha256=None):
+    """
+    加载参数直接指向 mmap 映射权重文件的 CPU 模型。
+
+    load_state_dict(assign=True) 让参数使用映射出的只读页而不是各自复制一份，
+    同一台机器上的多个 Streamlit 进程通过页缓存共享这份物理内存。
+    """
+    download_model(sha256)
+    model = build_skeleton()
+    state_dict = torch.load(MODEL_PATH, map_location="cpu", mmap=True, weights_only=True)
+    model.load_state_dict(state_dict, assign=True)
+    return model.eval()
+
+
+class _LogitsOnly(torch.nn.Module):
+    """导出 ONNX 时只保留 logits 输出"""
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids).logits
+
+
+def export_onnx(model, path=ONNX_PATH):
+    """将 PyTorch 模型导出为 batch 与序列长度均为动态维度的 ONNX 文件"""
+    model = model.cpu().eval()
+    dummy = torch.ones((1, 8), dtype=torch.long)
+    tmp_path = path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model),
+            (dummy, dummy, torch.zeros_like(dummy)),
+            tmp_path,
+            input_names=list(ONNX_INPUTS),
+            output_names=["logits"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in ONNX_INPUTS + ("logits",)},
+            opset_version=17,
+        )
+    os.replace(tmp_path, path)
+
+
+def is_stale(path):
+    """派生文件不存在或比原始权重旧时需要重新生成"""
+    return not os.path.exists(path) or (
+        os.path.exists(MODEL_PATH) and os.path.getmtime(path) < os.path.getmtime(MODEL_PATH)
+    )
+
+
+def quantize(model):
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_int8_model(sha256=None):
+    """
+    加载对 Linear 层做了动态 int8 量化的 CPU 模型。
+
+    量化后的 state_dict 缓存在 INT8_PATH。之后启动时先对 fp32 模型结构做同样的量化，得到相同的模块，
+    再以 weights_only=True 读入缓存的权重，不会执行文件中的 pickle 代码，也不必重新量化真实权重。
+    """
+    if not is_stale(INT8_PATH):
+        try:
+            state_dict = torch.load(INT8_PATH, map_location="cpu", weights_only=True)
+        except pickle.UnpicklingError:
+            # 旧版本缓存的是整个模块，重新量化生成
+            state_dict = None
+        if state_dict is not None:
+            skeleton = build_skeleton()
+            # 只需要模块结构；清零未初始化的参数，避免其中的 NaN 影响量化参数的计算
+            with torch.no_grad():
+                for parameter in skeleton.parameters():
+                    parameter.zero_()
+            model = quantize(skeleton)
+            model.load_state_dict(state_dict)
+            return model.eval()
+    model = quantize(load_torch_model(sha256).cpu())
+    tmp_path = INT8_PATH + ".tmp"
+    torch.save(model.state_dict(), tmp_path)
+    os.replace(tmp_path, INT8_PATH)
+    return model.eval()
+
+
+def create_onnx_session(path=ONNX_PATH, num_threads=None):
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    # 单条短信的算子很小，线程数默认取物理核数即可，多余的线程只会互相争抢
+    options.intra_op_num_threads = num_threads or max(1, (os.cpu_count() or 2) // 2)
+    options.inter_op_num_threads = 1
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
 
 class MsgClsModel:
 # %%
+    max_length = 128
 
     # Use Huawei Nezha model
-    def __init__(self):
+    def __init__(self, backend="torch", num_threads=None, sha256=None, shared_weights=False):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}, expected one of {BACKENDS}")
+        self.backend = backend
         self.lb = LabelEncoder()
         self.lb.classes_ = classes
         self.tokenizer = BertTokenizer.from_pretrained('bert-base-chinese')
-        self.model = BertForSequenceClassification.from_pretrained('bert-base-chinese', num_labels=len(classes)).to(device)
-        import os
-        if not os.path.exists(r"model/final_model.pth"):
-            print("Model not found, downloading...")
-            import requests
-            url = "https://dlink.host/1drv/aHR0cHM6Ly8xZHJ2Lm1zL3UvYy82YWE4YmQ4MzYxZWQ0NTkwL0VYT1F5WktPTnJSUG1vdENncVVodVI4QjZ4MV9uMjVfMDhFTGdlOHNURF9Fcnc_ZT05ZXB4WE4.pth"
-            response = requests.get(url)
-            os.makedirs("model", exist_ok=True)
-            with open("model/final_model.pth", "wb") as f:
-                f.write(response.content)
-        # Use Huawei Nezha model
-        self.model.load_state_dict(torch.load(r"model/final_model.pth", map_location=device))
-        if torch.cuda.is_available():
-            self.model = self.model.cuda()
+        # 量化模型与共享权重模式只在 CPU 上运行
+        self.device = torch.device("cpu") if backend == "int8" or shared_weights else device
+        if num_threads and backend != "onnx":
+            torch.set_num_threads(num_threads)
+        self.weights_path = {"torch": MODEL_PATH, "onnx": ONNX_PATH, "int8": INT8_PATH}[backend]
+        if backend == "onnx":
+            # 只在 ONNX 文件不存在或比权重旧时导出一次
+            if is_stale(ONNX_PATH):
+                export_onnx(load_torch_model(sha256), ONNX_PATH)
+            self.session = create_onnx_session(ONNX_PATH, num_threads)
+        elif backend == "int8":
+            self.model = load_int8_model(sha256)
+        elif shared_weights:
+            self.model = load_shared_torch_model(sha256)
+        else:
+            self.model = load_torch_model(sha256)
     
-    def encode_texts(self, texts):
-        return self.tokenizer(
-            texts,
-            padding='max_length',
-            truncation=True,
-            max_length=128,
-            return_tensors='pt',
-        )
-        
+    @property
+    def checksum(self):
+        """当前后端实际加载的权重文件的校验和"""
+        return f"{self.backend}:{weights_checksum(self.weights_path)}"
+
+    def tokenize(self, texts):
+        """分词但不 padding，返回每条文本各自的编码"""
+        encoded = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+        return [{key: encoded[key][i] for key in encoded.keys()} for i in range(len(texts))]
+
+    def tokenize_windows(self, texts, max_windows, overlap=32):
+        """
+        将长文本切成相互重叠的窗口，每个窗口不超过 max_length 个 token。
+
+        每条文本最多 max_windows 个窗口；需要更多窗口时，把窗口均匀铺满全文，
+        保证开头和结尾都能被看到。返回所有窗口的编码及每个窗口所属的文本下标。
+        """
+        body = self.max_length - 2  # 留出 [CLS] 与 [SEP]
+        step = max(body - overlap, 1)
+        encodings, owners = [], []
+        for i, ids in enumerate(self.tokenizer(texts, add_special_tokens=False)["input_ids"]):
+            last = max(len(ids) - body, 0)
+            count = min(-(-last // step) + 1, max_windows)
+            starts = [round(last * k / (count - 1)) for k in range(count)] if count > 1 else [0]
+            for start in starts:
+                input_ids = self.tokenizer.build_inputs_with_special_tokens(ids[start:start + body])
+                encodings.append({
+                    "input_ids": input_ids,
+                    "token_type_ids": [0] * len(input_ids),
+                    "attention_mask": [1] * len(input_ids),
+                })
+                owners.append(i)
+        return encodings, owners
+
+    def forward(self, batch):
+        """对一个已 padding 的批次做前向计算，返回 logits"""
+        if self.backend == "onnx":
+            inputs = {name: batch[name].numpy() for name in ONNX_INPUTS}
+            return torch.from_numpy(self.session.run(["logits"], inputs)[0]).float()
+        with torch.inference_mode():
+            return self.model(**batch.to(self.device)).logits.float().cpu()
+
+    def rank(self, probs):
+        return sorted(zip(self.lb.classes_, probs), key=lambda x: x[1], reverse=True)
+
     # %%
+    def logits(self, encodings, batch_size=32):
+        """
+        对分词结果做批量前向计算。
+
+        按 token 长度排序后切成 micro-batch，每个批次只 padding 到其中最长的一条，
+        返回按输入顺序排列的 logits。
+        """
+        order = sorted(range(len(encodings)), key=lambda i: len(encodings[i]['input_ids']))
+        results = torch.empty((len(encodings), len(classes)))
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            batch = self.tokenizer.pad([encodings[i] for i in indices], return_tensors='pt')
+            results[indices] = self.forward(batch)
+        return results
+
+    def predict_encoded(self, encodings, batch_size=32):
+        probs = torch.softmax(self.logits(encodings, batch_size), dim=1).numpy()
+        return [self.rank(p) for p in probs]
+
+    def predict_batch(self, texts, batch_size=32, max_windows=1, pool="max"):
+        """
+        批量预测，返回与 texts 顺序一致的 [(类别, 概率), ...] 列表。
+
+        max_windows > 1 时启用长文本模式：超过 max_length 的文本按滑动窗口切分，
+        所有文本的所有窗口一起批量推理，再按 pool（max 或 mean）汇总各窗口的 logits。
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        if max_windows <= 1:
+            return self.predict_encoded(self.tokenize(texts), batch_size=batch_size)
+        if pool not in ("max", "mean"):
+            raise ValueError(f"Unknown pool: {pool}, expected 'max' or 'mean'")
+        encodings, owners = self.tokenize_windows(texts, max_windows)
+        logits = self.logits(encodings, batch_size)
+        # 一次 scatter_reduce 按所属文本汇总所有窗口，每条文本至少有一个窗口
+        index = torch.tensor(owners).unsqueeze(1).expand_as(logits)
+        pooled = torch.zeros((len(texts), logits.shape[1])).scatter_reduce(
+            0, index, logits, "amax" if pool == "max" else "mean", include_self=False
+        )
+        return [self.rank(p) for p in torch.softmax(pooled, dim=1).numpy()]
+
     def predict(self, test_text):
-        output = self.model(**self.encode_texts([test_text]).to(device))
-        output = output.logits
-        output = torch.softmax(output, dim=1)
-        output = output.cpu().detach().numpy()
-        output = output[0]
-        output = list(zip(self.lb.classes_, output))
-        output = sorted(output, key=lambda x: x[1], reverse=True)
-        return output
+        return self.predict_batch([test_text])[0]
+
+
+def check_parity(texts, backend="onnx", reference="torch", top_k=3):
+    """
+    对比两个后端在同一批文本上的输出。
+
+    Returns:
+        dict: 前 top_k 类别排序不一致的文本下标，以及概率的最大绝对误差。
+    """
+    ref_preds = MsgClsModel(backend=reference).predict_batch(texts)
+    preds = MsgClsModel(backend=backend).predict_batch(texts)
+    mismatched, max_diff = [], 0.0
+    for i, (ref, pred) in enumerate(zip(ref_preds, preds)):
+        if [c for c, _ in ref[:top_k]] != [c for c, _ in pred[:top_k]]:
+            mismatched.append(i)
+        pred_probs = dict(pred)
+        max_diff = max(max_diff, max(abs(float(p) - float(pred_probs[c])) for c, p in ref))
+    return {"mismatched": mismatched, "max_abs_diff": max_diff}
+
+
+def load_labeled(path):
+    """读取带标注的数据文件（CSV 或 JSONL），每行需包含 text 与 label 两个字段"""
+    import csv
+    import json
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    return [row["text"] for row in rows], [row["label"] for row in rows]
+
+
+def evaluate(model, path, batch_size=32):
+    texts, labels = load_labeled(path)
+    preds = model.predict_batch(texts, batch_size=batch_size)
+    return sum(pred[0][0] == label for pred, label in zip(preds, labels)) / max(len(labels), 1)
+
+
+def compare_accuracy(path, backend="int8", reference="torch"):
+    """在留出的标注数据上比较两个后端的准确率"""
+    ref_acc = evaluate(MsgClsModel(backend=reference), path)
+    acc = evaluate(MsgClsModel(backend=backend), path)
+    return {reference: ref_acc, backend: acc, "delta": acc - ref_acc}
 
 # %%
 if __name__ == "__main__":
-    model = MsgClsModel()
+    import sys
+    backend = sys.argv[1] if len(sys.argv) > 1 else "torch"
+    model = MsgClsModel(backend=backend)
     test_text = "【顺丰】尊敬的客户，您使用顺丰的频率较高，现赠送您暖风扇一台，请添加支付宝好友进行登记领取。"
     print(model.predict(test_text))
+    if len(sys.argv) > 2:
+        print(compare_accuracy(sys.argv[2], backend=backend))
+    elif backend != "torch":
+        print(check_parity([test_text, "您好，抖音上发现有人提供替考驾驶证服务，每科仅需1400元，微信号为wei1in12345，如有需要请联系，我们保证快速通过考试。"], backend=backend))
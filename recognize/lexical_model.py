@@ -0,0 +1,87 @@
+"""
+字符 n-gram 线性分类器，作为 BERT 之前的快速预筛模型。
+
+用法：
+    python -m recognize.lexical_model train.csv --heldout test.csv
+
+训练数据与 MsgClsModel 使用同一套类别标签，格式同 fraud_msg_cls.load_labeled。
+"""
+import argparse
+import os
+
+import joblib
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+
+LEXICAL_MODEL_PATH = "model/lexical_model.joblib"
+
+
+class LexicalModel:
+    """TF-IDF 字符 1-3 gram + 逻辑回归，预测格式与 MsgClsModel 一致"""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    @classmethod
+    def train(cls, texts, labels):
+        pipeline = make_pipeline(
+            TfidfVectorizer(analyzer="char", ngram_range=(1, 3), min_df=2, sublinear_tf=True, max_features=200000),
+            LogisticRegression(max_iter=1000, C=10.0),
+        )
+        pipeline.fit(texts, labels)
+        return cls(pipeline)
+
+    @classmethod
+    def load(cls, path=LEXICAL_MODEL_PATH):
+        """模型文件不存在时返回 None"""
+        if not os.path.exists(path):
+            return None
+        return cls(joblib.load(path))
+
+    def save(self, path=LEXICAL_MODEL_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        joblib.dump(self.pipeline, path)
+
+    def predict_batch(self, texts):
+        classes = self.pipeline.classes_
+        return [
+            sorted(zip(classes, probs), key=lambda x: x[1], reverse=True)
+            for probs in self.pipeline.predict_proba(list(texts))
+        ]
+
+    def predict(self, text):
+        return self.predict_batch([text])[0]
+
+
+def main():
+    from recognize.fraud_msg_cls import classes, load_labeled
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("train", help="训练数据（CSV 或 JSONL，包含 text 与 label 字段）")
+    parser.add_argument("--heldout", help="留出的评估数据")
+    parser.add_argument("--output", default=LEXICAL_MODEL_PATH)
+    args = parser.parse_args()
+
+    texts, labels = load_labeled(args.train)
+    unknown = set(labels) - set(classes)
+    if unknown:
+        raise ValueError(f"Unknown labels: {sorted(unknown)}")
+    model = LexicalModel.train(texts, labels)
+    model.save(args.output)
+    print(f"Saved lexical model to {args.output}")
+
+    if args.heldout:
+        texts, labels = load_labeled(args.heldout)
+        preds = model.predict_batch(texts)
+        correct = sum(pred[0][0] == label for pred, label in zip(preds, labels))
+        print(f"Heldout accuracy: {correct / max(len(labels), 1):.4f}")
+        # 不同阈值下由预筛模型直接给出结果的比例与其准确率
+        for threshold in (0.7, 0.8, 0.9, 0.95, 0.99):
+            confident = [(pred, label) for pred, label in zip(preds, labels) if pred[0][1] >= threshold]
+            accuracy = sum(pred[0][0] == label for pred, label in confident) / max(len(confident), 1)
+            print(f"threshold={threshold}: answered {len(confident) / max(len(labels), 1):.2%}, accuracy {accuracy:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+测量 N 个工作进程各自加载 MsgClsModel 后的内存占用。
+
+用法：
+    python -m recognize.measure_memory --workers 4
+    python -m recognize.measure_memory --workers 4 --shared-weights
+
+USS（进程独占内存）反映每多开一个进程实际增加的内存；
+PSS 按共享页的进程数平摊，所有进程的 PSS 之和约等于总的物理内存占用。
+"""
+import argparse
+import multiprocessing as mp
+
+
+def read_memory():
+    """从 /proc/self/smaps_rollup 读取 RSS、PSS 与 USS，单位 MB"""
+    fields = {}
+    with open("/proc/self/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields.get("Rss", 0.0),
+        "pss": fields.get("Pss", 0.0),
+        "uss": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+def worker(backend, shared_weights, barrier, results):
+    from recognize.fraud_msg_cls import MsgClsModel
+    model = MsgClsModel(backend=backend, shared_weights=shared_weights)
+    model.predict("【顺丰】尊敬的客户，您使用顺丰的频率较高，现赠送您暖风扇一台，请添加支付宝好友进行登记领取。")
+    # 等所有进程都加载完毕后再测量，此时共享页已被全部进程映射
+    barrier.wait()
+    results.put(read_memory())
+    barrier.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--shared-weights", action="store_true")
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(args.workers)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=worker, args=(args.backend, args.shared_weights, barrier, results))
+        for _ in range(args.workers)
+    ]
+    for p in procs:
+        p.start()
+    stats = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    print(f"backend={args.backend} shared_weights={args.shared_weights} workers={args.workers}")
+    print(f"{'worker':>6} {'RSS(MB)':>10} {'PSS(MB)':>10} {'USS(MB)':>10}")
+    for i, m in enumerate(stats):
+        print(f"{i:>6} {m['rss']:>10.1f} {m['pss']:>10.1f} {m['uss']:>10.1f}")
+    print(f"{'total':>6} {sum(m['rss'] for m in stats):>10.1f} "
+          f"{sum(m['pss'] for m in stats):>10.1f} {sum(m['uss'] for m in stats):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import functools
+import hashlib
+import random
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+from recognize.result_cache import normalize_text
+
+# 同一批诈骗短信中经常变化的字段，替换成占位符后再计算签名；其余 ASCII 单词保留原文
+VARIABLE_PATTERNS = [
+    ("<url>", re.compile(r"(?:https?://|www\.)\S+|(?<![a-z0-9-])[a-z0-9-]+(?:\.[a-z0-9-]+)*\.(?:com|cn|net|org|co|cc|top|xyz|vip)(?:/\S*)?")),
+    ("<date>", re.compile(r"\d{2,4}[-/.年]\d{1,2}[-/.月]\d{1,2}日?|\d{1,2}月\d{1,2}[日号]|\d{1,2}[:：]\d{2}(?:[:：]\d{2})?")),
+    ("<card>", re.compile(r"(?<!\d)\d{17}[\dx](?!\d)|(?<!\d)\d{12,19}(?!\d)")),
+    ("<phone>", re.compile(r"(?<!\d)(?:\+?86)?1[3-9]\d{9}(?!\d)|(?<!\d)0\d{2,3}-?\d{7,8}(?!\d)")),
+    ("<amount>", re.compile(r"[¥$]\s*\d+(?:,\d{3})*(?:\.\d+)?|\d+(?:,\d{3})*(?:\.\d+)?\s*(?:万元|元|万|块|rmb)")),
+]
+# 占位符与 ASCII 单词各算一个词，其他字符（汉字、标点）逐字成词
+TOKEN_PATTERN = re.compile(r"<[a-z]+>|[a-z0-9_@]+|\S")
+
+
+def tokens(text):
+    text = normalize_text(text).lower()
+    for placeholder, pattern in VARIABLE_PATTERNS:
+        text = pattern.sub(f" {placeholder} ", text)
+    return TOKEN_PATTERN.findall(text)
+
+
+def shingles(text, n=3):
+    words = tokens(text)
+    if len(words) <= n:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def shingle_hashes(text):
+    """词 n-gram 集合的 64 位哈希，按升序排列"""
+    return array("Q", sorted(
+        int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big")
+        for gram in shingles(text)
+    ))
+
+
+def jaccard(a, b):
+    a = set(a)
+    return len(a.intersection(b)) / len(a.union(b))
+
+
+_PRIME = (1 << 61) - 1
+
+
+@functools.lru_cache(maxsize=None)
+def _permutations(num_perm, seed=1):
+    rng = random.Random(seed)
+    return tuple((rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm))
+
+
+def minhash(hashes, permutations):
+    """n-gram 哈希集合的 MinHash 签名"""
+    return array("Q", (min((a * h + b) % _PRIME for h in hashes) for a, b in permutations))
+
+
+def sketch(text, num_perm=64):
+    """
+    返回 (n-gram 哈希, MinHash 签名)，与 NearDupIndex(num_perm=num_perm) 使用相同的排列，
+    可在其他进程中预先计算后传给 assign
+    """
+    hashes = shingle_hashes(text)
+    return hashes, minhash(hashes, _permutations(num_perm))
+
+
+class Cluster:
+    def __init__(self, cluster_id, hashes, signature, example):
+        self.id = cluster_id
+        self.hashes = hashes  # 代表短信的 n-gram 哈希，用于确认相似度
+        self.signature = signature
+        self.example = example  # 簇的代表短信
+        self.size = 0
+        self.prediction = None  # 代表短信的识别结果，簇内其他短信直接复用
+
+
+class NearDupIndex:
+    """
+    近重复短信索引（MinHash-LSH）。
+
+    签名切成 bands 段分桶，至少有一段完全相同的簇才作为候选，
+    签名估计的 Jaccard 相似度不低于 threshold 后，再用代表短信的 n-gram 计算实际 Jaccard 相似度确认。
+    不同 n-gram 少于 min_shingles 的短信太短，模板相同也可能含义不同，总是单独成簇，不复用结果。
+    簇数超过 capacity 时淘汰最久未命中的簇，内存占用有上限。
+    """
+
+    def __init__(self, capacity=50000, threshold=0.6, num_perm=64, bands=16, min_shingles=12, first_id=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.capacity = capacity
+        self.threshold = threshold
+        self.min_shingles = min_shingles
+        self.num_perm = num_perm
+        self.rows = num_perm // bands
+        self.permutations = _permutations(num_perm)
+        self.tables = [{} for _ in range(bands)]
+        self.clusters = OrderedDict()
+        self.lock = threading.Lock()
+        self.next_id = first_id  # 下一个新簇的编号，断点续跑时从这里继续
+
+    def _bands(self, signature):
+        return [hash(tuple(signature[i * self.rows:(i + 1) * self.rows])) for i in range(len(self.tables))]
+
+    def _find(self, hashes, signature, bands):
+        seen = set()
+        for table, band in zip(self.tables, bands):
+            for cluster_id in table.get(band, ()):
+                if cluster_id in seen:
+                    continue
+                seen.add(cluster_id)
+                cluster = self.clusters[cluster_id]
+                same = sum(x == y for x, y in zip(cluster.signature, signature))
+                if same >= self.threshold * len(signature) and jaccard(cluster.hashes, hashes) >= self.threshold:
+                    return cluster
+        return None
+
+    def _new_id(self):
+        cluster_id = self.next_id
+        self.next_id += 1
+        return cluster_id
+
+    def _evict(self):
+        cluster_id, cluster = self.clusters.popitem(last=False)
+        for table, band in zip(self.tables, self._bands(cluster.signature)):
+            members = table[band]
+            members.remove(cluster_id)
+            if not members:
+                del table[band]
+
+    def assign(self, text, sketch=None):
+        """把短信归入相似的簇，没有相似簇时新建一个；返回该簇。sketch 为预先计算的 (n-gram 哈希, 签名)"""
+        if sketch is None:
+            hashes = shingle_hashes(text)
+            signature = minhash(hashes, self.permutations) if len(hashes) >= self.min_shingles else None
+        else:
+            hashes, signature = sketch
+        if len(hashes) < self.min_shingles:
+            # 不加入索引，其他短信不会归入这个簇
+            with self.lock:
+                cluster = Cluster(self._new_id(), hashes, signature, text)
+            cluster.size = 1
+            return cluster
+        bands = self._bands(signature)
+        with self.lock:
+            cluster = self._find(hashes, signature, bands)
+            if cluster is None:
+                cluster = Cluster(self._new_id(), hashes, signature, text)
+                self.clusters[cluster.id] = cluster
+                for table, band in zip(self.tables, bands):
+                    table.setdefault(band, []).append(cluster.id)
+                if len(self.clusters) > self.capacity:
+                    self._evict()
+            self.clusters.move_to_end(cluster.id)
+            cluster.size += 1
+            return cluster
+
+    def top_clusters(self, k=10):
+        """规模最大的 k 个簇，用于发现批量发送的诈骗活动"""
+        with self.lock:
+            clusters = sorted(self.clusters.values(), key=lambda c: c.size, reverse=True)[:k]
+            return [{"id": c.id, "size": c.size, "example": c.example} for c in clusters]
+
+    def stats(self):
+        with self.lock:
+            sizes = [c.size for c in self.clusters.values()]
+            return {
+                "clusters": len(sizes),
+                "messages": sum(sizes),
+                "duplicates": sum(sizes) - len(sizes),
+            }
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """全角转半角并合并空白，使同一模板的短信得到相同的缓存键"""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def text_key(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    识别结果缓存：内存中的有界 LRU + 磁盘上的 SQLite。
+
+    磁盘缓存记录生成结果时的模型版本 version（权重校验和等），
+    版本变化时自动清空，避免返回旧模型的结果。
+    """
+
+    def __init__(self, path="model/result_cache.sqlite", version="", capacity=10000):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.capacity = capacity
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT)")
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != version:
+                self.db.execute("DELETE FROM results")
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+
+    def get(self, text):
+        key = text_key(text)
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits["memory"] += 1
+                return self.memory[key]
+            row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value = json.loads(row[0])
+            self._remember(key, value)
+            self.hits["disk"] += 1
+            return value
+
+    def put(self, text, value):
+        self.put_many([(text, value)])
+
+    def put_many(self, items):
+        """写入多条 (text, value)，磁盘上在同一个事务中提交"""
+        # numpy 标量等无法直接序列化的值统一转为 float
+        rows = [(text_key(text), json.dumps(value, ensure_ascii=False, default=float)) for text, value in items]
+        if not rows:
+            return
+        with self.lock:
+            for key, data in rows:
+                self._remember(key, json.loads(data))
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?)", rows)
+
+    def stats(self):
+        with self.lock:
+            total = self.hits["memory"] + self.hits["disk"] + self.misses
+            return {
+                "memory_hits": self.hits["memory"],
+                "disk_hits": self.hits["disk"],
+                "misses": self.misses,
+                "hit_rate": (total - self.misses) / total if total else 0.0,
+                "memory_size": len(self.memory),
+                "disk_size": self.db.execute("SELECT count(*) FROM results").fetchone()[0],
+            }
@@ -0,0 +1,115 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+# 队列中的结束标记，shutdown() 之后最后一个入队
+_STOP = object()
+
+
+def _bucket(n):
+    """按 2 的幂分桶：1, 2, 4, 8, ..."""
+    return 1 << (max(n, 1).bit_length() - 1)
+
+
+class InferenceScheduler:
+    """
+    进程级的微批推理调度器。
+
+    所有会话的请求进入同一个队列，后台线程在凑满 max_batch_size 条
+    或等待超过 max_wait_ms 毫秒后，合并为一次 predict_batch 调用。
+    shutdown() 后不再接受新请求，已提交的请求处理完后后台线程退出。
+    """
+
+    def __init__(self, model, max_batch_size=32, max_wait_ms=5, max_windows=1):
+        self.model = model
+        self.max_windows = max_windows
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.batch_sizes = Counter()
+        self.queue_depths = Counter()
+        self.requests = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="msg-cls-scheduler", daemon=True)
+        self.thread.start()
+
+    def submit(self, text):
+        """提交一条文本，返回结果为 [(类别, 概率), ...] 的 Future"""
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("cannot submit after shutdown")
+            self.queue.put((text, future))
+        return future
+
+    def predict(self, text, timeout=None):
+        return self.submit(text).result(timeout=timeout)
+
+    def shutdown(self, wait=True):
+        """不再接受新请求；wait 为 True 时等待已提交的请求处理完毕"""
+        with self.lock:
+            if not self.closed:
+                self.closed = True
+                self.queue.put(_STOP)
+        if wait:
+            self.thread.join()
+
+    def _collect(self):
+        """取出一批请求，返回 (批, 是否遇到结束标记)"""
+        item = self.queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stop = self._collect()
+            if batch:
+                self._process(batch)
+            if stop:
+                return
+
+    def _process(self, batch):
+        with self.lock:
+            self.queue_depths[_bucket(self.queue.qsize() + len(batch))] += 1
+            self.batch_sizes[len(batch)] += 1
+            self.requests += len(batch)
+        # 跳过调用方已取消的请求
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = self.model.predict_batch(
+                [text for text, _ in batch], batch_size=self.max_batch_size, max_windows=self.max_windows
+            )
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        """当前队列深度，以及批大小和出队时队列深度的直方图"""
+        with self.lock:
+            return {
+                "queue_depth": self.queue.qsize(),
+                "requests": self.requests,
+                "batches": sum(self.batch_sizes.values()),
+                "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+                "queue_depth_histogram": dict(sorted(self.queue_depths.items())),
+            }
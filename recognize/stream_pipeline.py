@@ -0,0 +1,274 @@
+"""
+流式短信检测管道。
+
+用法：
+    cat messages.txt | python -m recognize.stream_pipeline
+    python -m recognize.stream_pipeline --tail /var/log/sms.log --output alerts.jsonl
+    python -m recognize.stream_pipeline --listen tcp://127.0.0.1:9999
+    python -m recognize.stream_pipeline --listen unix:///tmp/sms.sock
+
+每行一条短信，可以是纯文本，也可以是带 text 字段的 JSON。
+处理流程：规范化 → 规则特征 → 批量模型推理 → 告警输出，
+各阶段之间用有界队列连接，下游变慢时上游会阻塞等待，内存不会无限增长。
+运行期间定期向标准错误输出各阶段吞吐量与队列占用。
+某一批数据处理出错时，该批被丢弃并计入 errors，管道继续运行；
+结束时只要有过错误，以非零状态退出。
+"""
+import argparse
+import json
+import os
+import queue
+import socketserver
+import sys
+import threading
+import time
+import traceback
+
+_STOP = object()
+RISK_ORDER = ["无风险", "低风险", "中风险", "高风险"]
+
+
+class Stage(threading.Thread):
+    """
+    从 inbox 取最多 batch_size 条数据交给 func 处理，结果放入 outbox。
+
+    func 抛出异常时丢弃这一批并记录到 errors，不会让线程退出，
+    否则上游会一直阻塞在已满的队列上。
+    """
+
+    def __init__(self, name, func, inbox, outbox=None, batch_size=1, max_wait=0.05):
+        super().__init__(name=name, daemon=True)
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.processed = 0
+        self.errors = 0
+
+    def _take(self):
+        items = [self.inbox.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.batch_size and items[-1] is not _STOP:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self.inbox.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _process(self, items):
+        try:
+            for result in self.func(items):
+                if result is not None and self.outbox is not None:
+                    self.outbox.put(result)
+        except Exception:
+            self.errors += 1
+            print(f"[{self.name}] dropped a batch of {len(items)} records:", file=sys.stderr)
+            traceback.print_exc()
+        self.processed += len(items)
+
+    def run(self):
+        try:
+            while True:
+                items = self._take()
+                stop = items[-1] is _STOP
+                items = [item for item in items if item is not _STOP]
+                if items:
+                    self._process(items)
+                if stop:
+                    return
+        finally:
+            # 无论如何都通知下游结束，避免下游永远等待
+            if self.outbox is not None:
+                self.outbox.put(_STOP)
+
+
+def parse_line(line):
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+            return record if isinstance(record, dict) and record.get("text") else None
+        except json.JSONDecodeError:
+            pass
+    return {"text": line}
+
+
+# ---------------------------
+# 数据源：接收 put 回调，每读到一行调用一次
+# ---------------------------
+def stdin_source(put):
+    for line in sys.stdin:
+        put(line)
+
+
+def tail_source(path, from_start=False, poll_interval=0.2):
+    def source(put):
+        with open(path, "r", encoding="utf-8") as f:
+            if not from_start:
+                f.seek(0, os.SEEK_END)
+            while True:
+                line = f.readline()
+                if line:
+                    put(line)
+                else:
+                    time.sleep(poll_interval)
+    return source
+
+
+def socket_source(address):
+    """监听 tcp://host:port 或 unix:///path，每个连接逐行读取"""
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                self.server.put(raw.decode("utf-8", errors="replace"))
+
+    def source(put):
+        if address.startswith("unix://"):
+            path = address[len("unix://"):]
+            if os.path.exists(path):
+                os.remove(path)
+            server = socketserver.ThreadingUnixStreamServer(path, Handler)
+        else:
+            host, port = address[len("tcp://"):].rsplit(":", 1)
+            server = socketserver.ThreadingTCPServer((host, int(port)), Handler)
+        server.daemon_threads = True
+        server.put = put
+        with server:
+            server.serve_forever()
+    return source
+
+
+# ---------------------------
+# 管道
+# ---------------------------
+class Pipeline:
+    def __init__(self, model, extractor, sink, batch_size=32, queue_size=1024, min_level="中风险"):
+        from recognize.features import get_risk_level
+        from recognize.result_cache import normalize_text
+
+        self.sink = sink
+        self.min_rank = RISK_ORDER.index(min_level)
+        self.queues = {name: queue.Queue(maxsize=queue_size) for name in ("raw", "normalized", "featured", "scored")}
+
+        def normalize(lines):
+            for line in lines:
+                record = parse_line(line)
+                if record is not None:
+                    # 规范化文本只作为去重键，模型与告警使用原文
+                    record["text"] = str(record["text"])
+                    record["normalized"] = normalize_text(record["text"])
+                yield record
+
+        def featurize(records):
+            for record, features in zip(records, extractor.extract_batch([r["text"] for r in records])):
+                record["features"] = features
+                yield record
+
+        def classify(records):
+            # 同一批中规范化后相同的短信只推理一次
+            unique = {}
+            for record in records:
+                unique.setdefault(record["normalized"], record["text"])
+            predictions = dict(zip(unique, model.predict_batch(list(unique.values()), batch_size=batch_size)))
+            for record in records:
+                preds = predictions[record.pop("normalized")]
+                category, prob = preds[0]
+                record.update(prediction=category, probability=float(prob), risk_level=get_risk_level(category, prob))
+                yield record
+
+        def alert(records):
+            for record in records:
+                if RISK_ORDER.index(record["risk_level"]) >= self.min_rank:
+                    self.sink(record)
+            return ()
+
+        self.stages = [
+            Stage("normalize", normalize, self.queues["raw"], self.queues["normalized"], batch_size=64),
+            Stage("features", featurize, self.queues["normalized"], self.queues["featured"], batch_size=64),
+            Stage("classify", classify, self.queues["featured"], self.queues["scored"], batch_size=batch_size),
+            Stage("alert", alert, self.queues["scored"], batch_size=64),
+        ]
+
+    def stats(self):
+        return {
+            "processed": {stage.name: stage.processed for stage in self.stages},
+            "errors": {stage.name: stage.errors for stage in self.stages},
+            "queues": {name: f"{q.qsize()}/{q.maxsize}" for name, q in self.queues.items()},
+        }
+
+    def report(self, interval):
+        last, last_time = self.stats()["processed"], time.monotonic()
+        while any(stage.is_alive() for stage in self.stages):
+            time.sleep(interval)
+            stats, now = self.stats(), time.monotonic()
+            stats["rate"] = {
+                name: round((count - last[name]) / (now - last_time), 1) for name, count in stats["processed"].items()
+            }
+            last, last_time = stats["processed"], now
+            print(json.dumps(stats, ensure_ascii=False), file=sys.stderr, flush=True)
+
+    def run(self, source, stats_interval=5.0):
+        for stage in self.stages:
+            stage.start()
+        threading.Thread(target=self.report, args=(stats_interval,), daemon=True).start()
+        try:
+            # 队列已满时 put 会阻塞，从而让数据源停止读取
+            source(self.queues["raw"].put)
+        except KeyboardInterrupt:
+            pass
+        self.queues["raw"].put(_STOP)
+        for stage in self.stages:
+            stage.join()
+        stats = self.stats()
+        print(json.dumps(stats, ensure_ascii=False), file=sys.stderr)
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source_group = parser.add_mutually_exclusive_group()
+    source_group.add_argument("--tail", help="持续读取文件新增的行")
+    source_group.add_argument("--listen", help="监听本地 socket，如 tcp://127.0.0.1:9999 或 unix:///tmp/sms.sock")
+    parser.add_argument("--from-start", action="store_true", help="--tail 时从文件开头读取")
+    parser.add_argument("--output", help="告警输出的 JSONL 文件，默认输出到标准输出")
+    parser.add_argument("--min-level", default="中风险", choices=RISK_ORDER[1:])
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--keywords", default="recognize/fraud_keywords.json")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--queue-size", type=int, default=1024)
+    parser.add_argument("--stats-interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    from recognize.features import FeatureExtractor
+    from recognize.fraud_msg_cls import MsgClsModel
+
+    with open(args.keywords, "r", encoding="utf-8") as f:
+        extractor = FeatureExtractor([word for word, _ in json.load(f)])
+    model = MsgClsModel(backend=args.backend)
+
+    out = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+
+    def sink(record):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+    if args.tail:
+        source = tail_source(args.tail, from_start=args.from_start)
+    elif args.listen:
+        source = socket_source(args.listen)
+    else:
+        source = stdin_source
+    stats = Pipeline(model, extractor, sink, batch_size=args.batch_size, queue_size=args.queue_size,
+                     min_level=args.min_level).run(source, stats_interval=args.stats_interval)
+    if any(stats["errors"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+服务启动时在后台线程预加载重资源。
+
+app.py 在进程启动后调用一次 start()：读取关键词表、初始化 jieba 词典、加载 MsgClsModel，
+并用一条短信做一次前向推理，让第一位用户打开短信识别页时不必等待这些初始化。页面通过同一个 Future 等待结果。
+预加载失败后保留失败的 Future 供 status() 展示，只有短信识别页以 retry=True 请求模型、
+且距上次失败超过 RETRY_INTERVAL 秒时才重新加载。
+"""
+import json
+import threading
+import time
+from concurrent.futures import Future
+
+from streamlit.logger import get_logger
+
+KEYWORDS_PATH = "recognize/fraud_keywords.json"
+# 预加载失败后至少间隔这么久（秒）才重试
+RETRY_INTERVAL = 60
+
+logger = get_logger(__name__)
+_lock = threading.Lock()
+_future = None
+_started = None
+_failed_at = None
+_attempts = 0
+
+
+def msg_cls_options(secrets):
+    """从 st.secrets 读取 MsgClsModel 的参数"""
+    return {
+        "backend": secrets.get("MSG_CLS_BACKEND", "torch"),
+        "num_threads": secrets.get("MSG_CLS_THREADS"),
+        # False 表示显式跳过下载校验，None 表示使用固定的发布版本摘要
+        "sha256": (secrets.get("MSG_CLS_MODEL_SHA256") or None) if secrets.get("MSG_CLS_VERIFY_SHA256", True) else False,
+        "shared_weights": secrets.get("MSG_CLS_SHARED_WEIGHTS", False),
+    }
+
+
+def _load(options):
+    timings = {}
+    start = time.perf_counter()
+
+    with open(KEYWORDS_PATH, "r", encoding="utf-8") as f:
+        keywords = json.load(f)
+    timings["keywords_s"] = time.perf_counter() - start
+
+    import jieba
+    step = time.perf_counter()
+    jieba.initialize()
+    timings["jieba_s"] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    from recognize.fraud_msg_cls import MsgClsModel
+    model = MsgClsModel(**options)
+    timings["model_s"] = time.perf_counter() - step
+
+    # 首次前向推理会触发算子的延迟初始化
+    step = time.perf_counter()
+    model.predict("【预热】这是一条用于预热模型的短信，请忽略。")
+    timings["first_predict_s"] = time.perf_counter() - step
+
+    timings["total_s"] = time.perf_counter() - start
+    return {"keywords": keywords, "model": model, "timings": timings}
+
+
+def _run(future, options):
+    global _failed_at
+    try:
+        result = _load(options)
+    except BaseException as e:
+        with _lock:
+            _failed_at = time.time()
+        logger.exception("Warm-up failed")
+        future.set_exception(e)
+        return
+    logger.info(
+        "Warm-up ready in %.2fs (%s)",
+        result["timings"]["total_s"],
+        ", ".join(f"{name}={seconds:.2f}s" for name, seconds in result["timings"].items() if name != "total_s"),
+    )
+    future.set_result(result)
+
+
+def _should_retry():
+    return _future.done() and _future.exception() is not None and time.time() - _failed_at >= RETRY_INTERVAL
+
+
+def start(options, retry=False):
+    """
+    启动后台预加载（每个进程只启动一次），返回结果为 {keywords, model, timings} 的 Future。
+
+    retry 为 True 且上次预加载失败已超过 RETRY_INTERVAL 秒时重新加载，否则返回失败的 Future。
+    """
+    global _future, _started, _attempts
+    with _lock:
+        if _future is None or (retry and _should_retry()):
+            _future = Future()
+            _started = time.time()
+            _attempts += 1
+            logger.info("Warm-up started (attempt %d)", _attempts)
+            threading.Thread(target=_run, args=(_future, options), name="warmup", daemon=True).start()
+        return _future
+
+
+def status():
+    """预加载状态，用于页面展示"""
+    with _lock:
+        future, failed_at, attempts = _future, _failed_at, _attempts
+    if future is None:
+        return {"state": "not started"}
+    if not future.done():
+        return {"state": "loading", "elapsed_s": round(time.time() - _started, 2)}
+    error = future.exception()
+    if error is not None:
+        return {
+            "state": "failed",
+            "error": str(error),
+            "attempts": attempts,
+            "retry_in_s": max(0, round(failed_at + RETRY_INTERVAL - time.time())),
+        }
+    return {"state": "ready", **{name: round(seconds, 2) for name, seconds in future.result()["timings"].items()}}
@@ -1,16 +1,11 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 from streamlit_extras.colored_header import colored_header
-import plotly.graph_objects as go
-import numpy as np
-import plotly.express as px
-import pandas as pd
 
-from collections import Counter
 import json
-from openai import OpenAI
-import openai
+import time
+from recognize.features import get_risk_level
+
+# pandas、plotly、openai 只在用到的函数内导入，打开页面时不必加载
 
 with st.sidebar:
 
@@ -29,7 +24,19 @@ with st.sidebar:
             "置信度阈值", min_value=0.7, max_value=0.99, value=0.9, step=0.01
         )
 
-        analysis_depth = st.selectbox("分析深度", ["快速模式", "标准模式", "深度模式"])
+        analysis_depth = st.selectbox(
+            "分析深度",
+            ["快速模式", "标准模式", "深度模式"],
+            help="快速模式：字符模型预筛，置信度低于阈值时再使用 BERT\n\n标准模式：仅使用 BERT\n\n深度模式：BERT + DeepSeek 建议",
+        )
+
+        advice_timing = st.selectbox(
+            "建议生成时机",
+            ["识别后立即生成", "推测生成", "图表渲染后生成"],
+            help="仅在深度模式下生效\n\n识别后立即生成：得到类别后立即请求建议，渲染图表的同时接收\n\n"
+                 "推测生成：BERT 识别期间按关键词特征推测风险等级并提前请求，推测错误时重新请求\n\n"
+                 "图表渲染后生成：图表全部渲染后再请求",
+        )
     
         st.header("DeepSeek API Key 配置")
         use_custom_openai = st.checkbox('自定义 DeepSeek 连接配置')
@@ -44,32 +51,115 @@ with st.sidebar:
             st.session_state.openai_base_url = st.secrets['OPENAI_BASE_URL']
         
         if st.button('检查 API Key 可用性'):
-            import openai
+            import llm_gateway
             with st.spinner('正在验证...'):
                 try:
-                    openai.base_url = st.session_state.openai_base_url
-                    openai.api_key = st.session_state.openai_api_key
-                    openai.models.retrieve(st.session_state.openai_model)
+                    llm_gateway.check_model(
+                        st.session_state.openai_api_key,
+                        st.session_state.openai_base_url,
+                        st.session_state.openai_model,
+                    )
                     st.success('API Key 验证成功', icon='✅')
                 except Exception as e:
                     st.error(e, icon='❌')
                     
+def await_warmup():
+    """等待 app.py 启动的后台预加载完成，单独运行本页面时在这里启动；上次预加载失败时按间隔重试"""
+    from recognize import warmup
+    return warmup.start(warmup.msg_cls_options(st.secrets), retry=True).result()
+
 @st.cache_resource(show_spinner=False)
-def init_keywords():    
-    with open("recognize/fraud_keywords.json", "r", encoding="utf-8") as f:
-        keywords = json.load(f)
-    return keywords
+def init_keywords():
+    return await_warmup()["keywords"]
 
 @st.cache_resource(show_spinner=False)
 def init_msg_cls():
-    from recognize import fraud_msg_cls
-    return fraud_msg_cls.MsgClsModel()
+    return await_warmup()["model"]
+
+@st.cache_resource(show_spinner=False)
+def init_scheduler():
+    """所有会话共享的微批推理调度器"""
+    from recognize.scheduler import InferenceScheduler
+    return InferenceScheduler(
+        init_msg_cls(),
+        max_batch_size=st.secrets.get("MSG_CLS_MAX_BATCH", 32),
+        max_wait_ms=st.secrets.get("MSG_CLS_MAX_WAIT_MS", 5),
+        max_windows=st.secrets.get("MSG_CLS_MAX_WINDOWS", 1),
+    )
+
+@st.cache_resource(show_spinner=False)
+def init_result_cache():
+    """识别结果缓存，模型权重或关键词表变化时自动失效"""
+    from recognize.result_cache import ResultCache
+    from recognize.download import file_sha256
+    version = ":".join([
+        init_msg_cls().checksum,
+        file_sha256("recognize/fraud_keywords.json"),
+        f"windows={init_scheduler().max_windows}",
+    ])
+    return ResultCache(path="model/result_cache.sqlite", version=version)
+
+@st.cache_resource(show_spinner=False)
+def init_lexical_model():
+    """快速模式使用的预筛模型，未训练时返回 None"""
+    from recognize.lexical_model import LexicalModel
+    return LexicalModel.load()
+
+@st.cache_resource(show_spinner=False)
+def init_near_dup_index():
+    """近重复短信索引，相似短信复用同一簇代表短信的 BERT 结果"""
+    from recognize.near_dup import NearDupIndex
+    return NearDupIndex(capacity=st.secrets.get("NEAR_DUP_CAPACITY", 50000))
 
-with st.spinner("正在加载模型..."):
+@st.cache_resource(show_spinner=False)
+def init_feature_extractor():
+    from recognize.features import FeatureExtractor
     keywords = init_keywords()
-    keywords = [keywords[i][0] for i in range(len(keywords))]
-    model = init_msg_cls()
-    import jieba
+    return FeatureExtractor([keywords[i][0] for i in range(len(keywords))])
+
+@st.cache_resource(show_spinner=False)
+def init_advice_cache():
+    """DeepSeek 建议缓存，同一簇、同一类别的短信复用已生成的建议"""
+    from recognize.advice_cache import AdviceCache
+    return AdviceCache(
+        capacity=st.secrets.get("ADVICE_CACHE_CAPACITY", 2000),
+        ttl=st.secrets.get("ADVICE_CACHE_TTL", 86400),
+    )
+
+try:
+    with st.spinner("正在加载模型..."):
+        model = init_msg_cls()
+        scheduler = init_scheduler()
+        result_cache = init_result_cache()
+        feature_extractor = init_feature_extractor()
+        lexical_model = init_lexical_model()
+        near_dup_index = init_near_dup_index()
+        advice_cache = init_advice_cache()
+except Exception as e:
+    # 加载失败时展示预加载状态（错误信息与距下次重试的时间），而不是直接抛出异常
+    from recognize import warmup
+    st.error(f"⚠️ 模型加载失败: {str(e)}")
+    st.json(warmup.status())
+    st.stop()
+
+with st.sidebar:
+    with st.expander("📈 运行状态"):
+        from recognize import warmup
+        st.markdown("**模型预加载**")
+        st.json(warmup.status())
+        st.markdown("**推理队列**")
+        st.json(scheduler.stats())
+        st.markdown("**结果缓存**")
+        st.json(result_cache.stats())
+        st.markdown("**相似短信簇**")
+        st.json(near_dup_index.stats())
+        st.markdown("**建议缓存**")
+        st.json(advice_cache.stats())
+        st.markdown("**建议首字延迟（本会话，秒）**")
+        st.json({
+            timing: {"count": len(samples), "mean": round(sum(samples) / len(samples), 3)}
+            for timing, samples in st.session_state.get("advice_ttft", {}).items()
+        })
 
 # ---------------------------
 # 页面配置
@@ -81,82 +171,70 @@ with st.spinner("正在加载模型..."):
 #     initial_sidebar_state="expanded",
 # )
 
-def extract_keywords(text, top_k=3):
-    """提取文本中的危险关键词"""
-    words = jieba.lcut(text)
-    
-    # 过滤条件：长度 > 1 + 非停用词 + 属于危险词表
-    stopwords = {'的', '了', '是', '在', '和', '就', '都', '而', '及', '与', '这', '那', '有'}
-    danger_words = [
-        word for word in words 
-        if len(word) > 1 
-        and word not in stopwords 
-        and word in keywords
-    ]
-    
-    # 统计词频并排序
-    word_counts = Counter(danger_words)
-    
-    # 获取排序后的关键词列表
-    result = [word for word, _ in word_counts.most_common(top_k)]
-    
-    # 如果没有检测到关键词，返回包含"无"的列表
-    return result if result else ["无"]
+def build_result(text, predictions, tier):
+    max_category, max_prob = predictions[0]
+    features = feature_extractor.extract(text)
+    return {
+        "prediction": max_category,
+        "probability": float(max_prob),
+        "tier": tier,  # 给出结果的模型
+        "features": {
+            "风险等级": get_risk_level(max_category, max_prob),
+            # 实时特征
+            **features,
+            "语义异常度": max_prob * 100,  # 直接使用模型置信度
+        },
+        "full_predictions": predictions,  # 保留完整预测结果
+    }
 
 
-def get_risk_level(res, prob):
-    """根据概率计算风险等级"""
-    if res == "无风险":
-        return "无风险"
-    elif prob > 0.7:
-        return "高风险"
-    elif prob > 0.5:
-        return "中风险"
-    else:
-        return "低风险"
+def classify_texts(texts, depth="标准模式", threshold=0.9, index=None):
+    """
+    按分析深度分级识别一组文本，返回与 texts 顺序一致的结果。
+
+    快速模式先用字符 n-gram 模型预筛，置信度不低于阈值时直接返回，否则交给 BERT；
+    标准模式与深度模式直接使用 BERT。缓存中只保存 BERT 实际推理得到的结果。
+    与已识别短信近似重复（n-gram 的 Jaccard 相似度经过确认）的文本直接复用该簇代表短信的 BERT 结果，
+    index 为使用的近重复索引，默认是所有会话共享的索引。
+    需要 BERT 的文本一起提交给调度器，由调度器合并成批推理。
+    """
+    index = index or near_dup_index
+    clusters = [index.assign(text) for text in texts]
+    results, pending, inferred, computed = [None] * len(texts), {}, set(), []
+    for i, (text, cluster) in enumerate(zip(texts, clusters)):
+        # 同一模板的短信直接复用缓存结果
+        cached = result_cache.get(text)
+        if cached is not None:
+            results[i] = dict(cached, cluster=cluster.id)
+            continue
+        if depth == "快速模式" and lexical_model is not None and cluster.prediction is None:
+            predictions = lexical_model.predict(text)
+            if predictions[0][1] >= threshold:
+                results[i] = dict(build_result(text, predictions, "字符 n-gram 预筛模型"), cluster=cluster.id)
+                continue
+        if cluster.prediction is None and cluster.id not in pending:
+            pending[cluster.id] = scheduler.submit(text)
+            inferred.add(i)
+    for i, (text, cluster) in enumerate(zip(texts, clusters)):
+        if results[i] is not None:
+            continue
+        if cluster.prediction is None:
+            cluster.prediction = pending[cluster.id].result()
+        if i in inferred:
+            result = build_result(text, cluster.prediction, "BERT 分类模型")
+            computed.append((text, result))
+        else:
+            # 复用的结果不写入缓存，以免近重复判断出错时错误的结果被长期保存
+            result = build_result(text, cluster.prediction, "BERT 分类模型（复用相似短信结果）")
+        results[i] = dict(result, cluster=cluster.id)
+    # 批量上传时每块只提交一次事务
+    result_cache.put_many(computed)
+    return results
 
 
-def predict_text(text):
+def predict_text(text, depth="标准模式", threshold=0.9):
     try:
-        predictions = model.predict(text)
-        max_category, max_prob = predictions[0]
-
-        # 特征计算函数
-        def calculate_link_risk(text):
-            """链接风险计算：检查文本中的URL"""
-            import re
-
-            url_pattern = r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+|www\.[^\s]+"
-            urls = re.findall(url_pattern, text)
-            return min(len(urls) * 60 + 30, 100)  # 每个链接增加30%风险，上限100%
-
-        def calculate_keyword_risk(text):
-            """关键词风险：基于预定义诈骗词表"""
-            words = jieba.lcut(text)
-            hit_count = sum(1 for word in words if word in keywords)
-            return min(hit_count * 20 + 28, 100)  # 每个关键词20%，上限100%
-
-        def calculate_urgency_score(text):
-            """紧迫性评分：检测时间敏感词汇"""
-            urgency_words = ["立即", "马上", "尽快", "赶快", "今天", "现在", "机会"]
-            words = jieba.lcut(text)
-            count = sum(1 for word in words if word in urgency_words)
-            return min(count * 25 + 32, 100)  # 每个词25%，上限100%
-
-        return {
-            "prediction": max_category,
-            "probability": float(max_prob),
-            "features": {
-                "风险等级": get_risk_level(max_category, max_prob),
-                "关键词": extract_keywords(text),
-                # 实时特征
-                "关键词风险": calculate_keyword_risk(text),
-                "链接风险": calculate_link_risk(text),
-                "紧迫性指数": calculate_urgency_score(text),
-                "语义异常度": max_prob * 100,  # 直接使用模型置信度
-            },
-            "full_predictions": predictions,  # 保留完整预测结果
-        }
+        return classify_texts([text], depth, threshold)[0]
     except Exception as e:
         st.error(f"分析失败: {str(e)}")
         return None
@@ -216,6 +294,10 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+# 修改提示词后递增版本号，使缓存的旧建议失效
+PROMPT_VERSION = 1
+
+
 def get_suggestions_stream(msg, prediction):
     prompt_template = """
     我这里有一条疑似欺诈的信息，以下是信息内容：
@@ -236,33 +318,91 @@ def get_suggestions_stream(msg, prediction):
 
     建议内容：
     """
+    import llm_gateway
+
     prompt = prompt_template.format(msg=msg, prediction=prediction)
-    response_stream = OpenAI().chat.completions.create(
-        model=st.session_state.openai_model,
-        messages=[
+    return llm_gateway.stream_chat(
+        [
             {"role": "system", "content": "The following is a message that I received from a user and I need your help to respond to it."},
             {"role": "user", "content": prompt},
         ],
         max_tokens=1024,
         temperature=1.0,
-        stream=True,
     )
-    return response_stream
+
+
+def advice_stream(msg, category, risk_level, cluster_id, speculative=None):
+    """
+    优先回放缓存的建议，未命中时调用 DeepSeek 生成。
+
+    speculative 为 (推测的风险等级, 已经发出的建议请求)，推测正确时沿用该请求，否则取消。
+    """
+    key = (category, risk_level, cluster_id, PROMPT_VERSION, st.session_state.openai_model)
+    if speculative is not None and speculative[0] != risk_level:
+        speculative[1].close()
+        speculative = None
+    if speculative is not None:
+        # 缓存命中时推测的请求不再被读取，回收时自动取消
+        return advice_cache.stream(key, lambda: speculative[1])
+    return advice_cache.stream(key, lambda: get_suggestions_stream(msg, risk_level))
+
+
+def guess_risk_level(text):
+    """BERT 识别完成之前推测风险等级：有预筛模型时使用预筛模型，否则根据关键词与链接特征"""
+    if lexical_model is not None:
+        category, prob = lexical_model.predict(text)[0]
+        return get_risk_level(category, prob)
+    features = feature_extractor.extract(text)
+    many_keywords = features["关键词风险"] >= 68  # 至少 2 个危险关键词
+    has_keyword = features["关键词风险"] >= 48
+    has_link = features["链接风险"] >= 90
+    if many_keywords or (has_keyword and has_link):
+        return "高风险"
+    if has_keyword or has_link:
+        return "中风险"
+    return "无风险"
+
+
+def timed_stream(stream, started, timing):
+    """记录从点击检测到收到第一个片段的耗时"""
+    for chunk in stream:
+        if started is not None:
+            ttft = time.perf_counter() - started
+            st.session_state.setdefault("advice_ttft", {}).setdefault(timing, []).append(ttft)
+            st.session_state.last_advice_ttft = ttft
+            started = None
+        yield chunk
 
 # 开始检测
 
-def visualize_result(input_text, result_container):
+def visualize_result(input_text, result_container, depth, threshold, advice_timing="识别后立即生成"):
+    import plotly.graph_objects as go
+
+    started = time.perf_counter()
     # 检测输入文本长度
     with result_container:
         if len(input_text) < 10:
             st.error("⚠️ 输入文本过短，请至少输入10个字符")
         else:
+            advice = None
+            speculative = None
+            if depth == "深度模式" and advice_timing == "推测生成":
+                guess = guess_risk_level(input_text)
+                speculative = (guess, get_suggestions_stream(input_text, guess))
         # 动态可视化组件
         # 运行
             with st.spinner("▸▸ 正在生成可视化报告..."):
                 try:
-                    result = predict_text(input_text)
+                    result = predict_text(input_text, depth, threshold)
+                    if result is None:
+                        st.stop()
                     st.toast(":rainbow[识别完成！]", icon="🥳")
+                    if depth == "深度模式" and advice_timing != "图表渲染后生成":
+                        # 类别确定后立即发出请求，渲染图表期间网关在后台接收建议
+                        advice = advice_stream(
+                            input_text, result['prediction'], result['features']['风险等级'], result['cluster'],
+                            speculative,
+                        )
 
                 except Exception as e:
                     st.error(f"⚠️ 发生错误: {str(e)}")
@@ -298,6 +438,7 @@ def visualize_result(input_text, result_container):
                             <h3 style="color:white; text-align:center; margin:1rem 0;">{risk_level}</h2>
                             <h4 style="color:white; text-align:center; ">🎯 {result['prediction']}</h4>
                             <h5 style="color:white; text-align:left; ">⚠️ 危险关键词：{keywords_display}</h4>
+                            <h5 style="color:white; text-align:left; ">🧠 判定模型：{result.get('tier', 'BERT 分类模型')}</h5>
                         </div>
                         """,
                         unsafe_allow_html=True,
@@ -384,6 +525,10 @@ def visualize_result(input_text, result_container):
                     )
                     st.plotly_chart(fig_gauge, use_container_width=True)
                 
+            # 只有深度模式才调用大模型生成建议
+            if depth != "深度模式":
+                return
+
             # 结果分析
             colored_header(
                 label="💡 建议与防护",
@@ -393,9 +538,15 @@ def visualize_result(input_text, result_container):
             
             with st.spinner("▸▸ 正在生成建议..."):
                 try:
-                    suggestions_stream = get_suggestions_stream(input_text, result['features']['风险等级'])
+                    if advice is None:
+                        advice = advice_stream(
+                            input_text, result['prediction'], result['features']['风险等级'], result['cluster']
+                        )
+                    st.session_state.last_advice_ttft = None
                     with st.expander("DeepSeek 建议", expanded=True, icon='🚀'):
-                        st.write_stream(suggestions_stream)
+                        st.write_stream(timed_stream(advice, started, advice_timing))
+                    if st.session_state.last_advice_ttft is not None:
+                        st.caption(f"⏱️ 首字延迟 {st.session_state.last_advice_ttft:.2f} 秒（{advice_timing}）")
                     st.toast(":rainbow[建议已生成！]", icon="🎉")
                 except Exception as e:
                     st.error(f"⚠️ 发生错误: {str(e)}")
@@ -403,39 +554,190 @@ def visualize_result(input_text, result_container):
                 
                 
 # ---------------------------
-# 界面布局
+# 批量上传
 # ---------------------------
-# 标题
-st.markdown('<h1 class="main-title">🛡️ 智能诈骗信息检测 🚀</h1>', unsafe_allow_html=True)
-st.session_state.show_result = False
+@st.cache_data(show_spinner=False)
+def read_upload(data, name):
+    """读取上传的 CSV / XLSX 文件，CSV 兼容 UTF-8 与 GBK 编码"""
+    import io
+    import pandas as pd
+    if name.endswith(".xlsx"):
+        return pd.read_excel(io.BytesIO(data))
+    try:
+        return pd.read_csv(io.BytesIO(data), encoding="utf-8-sig")
+    except UnicodeDecodeError:
+        return pd.read_csv(io.BytesIO(data), encoding="gbk")
 
-text_col, button_col = st.columns([3, 1], gap="large")
-result_area = st.empty()
 
+def classify_batch(texts, progress, depth, threshold, chunk_size=256):
+    """
+    分块批量识别并更新进度条，与单条检测使用相同的分析深度、结果缓存与推理调度器。
 
+    上传的文件使用单独的近重复索引，不挤占单条检测共享索引中的簇；
+    每块新识别的结果在同一个事务中写入结果缓存。
+    """
+    import pandas as pd
+    from recognize.near_dup import NearDupIndex
+
+    index = NearDupIndex(capacity=max(len(texts), 1))
+    rows = []
+    for start in range(0, len(texts), chunk_size):
+        chunk = texts[start:start + chunk_size]
+        for text, result in zip(chunk, classify_texts(chunk, depth, threshold, index=index)):
+            features = result["features"]
+            rows.append({
+                "短信内容": text,
+                "预测类别": result["prediction"],
+                "置信度": round(result["probability"], 4),
+                "风险等级": features["风险等级"],
+                "关键词": "、".join(features["关键词"]),
+                "关键词风险": features["关键词风险"],
+                "链接风险": features["链接风险"],
+                "紧迫性指数": features["紧迫性指数"],
+                "相似短信簇": result["cluster"],
+            })
+        done = min(start + chunk_size, len(texts))
+        progress.progress(done / len(texts), text=f"▸▸ 已识别 {done}/{len(texts)} 条")
+    return pd.DataFrame(rows)
+
+
+def render_batch_upload(depth, threshold):
+    import plotly.express as px
+
+    uploaded = st.file_uploader("📂 上传短信文件（CSV / XLSX）", type=["csv", "xlsx"])
+    if uploaded is None:
+        st.info("请上传包含短信内容的 CSV 或 XLSX 文件，每行一条短信。", icon="ℹ️")
+        return
+    try:
+        data = read_upload(uploaded.getvalue(), uploaded.name)
+    except Exception as e:
+        st.error(f"⚠️ 文件读取失败: {str(e)}")
+        return
+    columns = list(data.columns)
+    default_index = columns.index("text") if "text" in columns else 0
+    text_column = st.selectbox("短信内容所在列", columns, index=default_index)
+    state_key = (uploaded.file_id, text_column)
+
+    if st.button(f"开始批量检测（共 {len(data)} 条）", type="primary", use_container_width=True):
+        texts = data[text_column].fillna("").astype(str).tolist()
+        progress = st.progress(0.0, text="▸▸ 正在识别...")
+        try:
+            data = classify_batch(texts, progress, depth, threshold)
+        except Exception as e:
+            progress.empty()
+            st.error(f"分析失败: {str(e)}")
+            return
+        st.session_state.batch_results = {"key": state_key, "data": data}
+        st.session_state.batch_advice = {}
+        progress.empty()
+        st.toast(":rainbow[批量识别完成！]", icon="🥳")
+
+    batch = st.session_state.get("batch_results")
+    if not batch or batch["key"] != state_key:
+        return
+    results = batch["data"]
+
+    colored_header(
+        label="📊 批量识别汇总",
+        description=f"共识别 **{len(results)}** 条短信",
+        color_name="gray-70",
+    )
+    col1, col2 = st.columns([3, 2], gap="large")
+    with col1:
+        distribution = results["预测类别"].value_counts().reset_index()
+        distribution.columns = ["类别", "条数"]
+        fig = px.bar(distribution, x="类别", y="条数", text="条数", color="条数", color_continuous_scale="Reds")
+        fig.update_layout(height=320, margin=dict(t=20, b=20))
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        risk_table = (
+            results.groupby("风险等级")
+            .agg(条数=("短信内容", "size"), 平均置信度=("置信度", "mean"))
+            .reindex(["高风险", "中风险", "低风险", "无风险"])
+            .dropna()
+        )
+        risk_table["占比"] = (risk_table["条数"] / len(results)).map("{:.1%}".format)
+        st.dataframe(risk_table, use_container_width=True)
+        st.download_button(
+            "⬇️ 下载识别结果",
+            results.to_csv(index=False).encode("utf-8-sig"),
+            file_name=f"识别结果_{uploaded.name.rsplit('.', 1)[0]}.csv",
+            mime="text/csv",
+            use_container_width=True,
+        )
 
-# 输入区域
-with text_col:
-    input_text = st.text_area(
-        "📝 请输入待检测的文本内容：",
-        height=100,
-        placeholder="例：【顺丰】尊敬的客户，您使用顺丰的频率较高，现赠送您暖风扇一台，请添加支付宝好友进行登记领取。",
-        help="支持中文文本检测，建议输入50-500字",
+    colored_header(
+        label="📝 识别明细",
+        description="选中某一行即可查看详情，并生成 DeepSeek 建议",
+        color_name="gray-70",
+    )
+    event = st.dataframe(
+        results,
+        on_select="rerun",
+        selection_mode="single-row",
+        hide_index=True,
+        use_container_width=True,
+        key="batch_table",
     )
-with button_col:
-    if st.button("开始检测", use_container_width=True, type="primary", help="点击进行诈骗信息检测"):
-        visualize_result(input_text, result_area.container())
-        st.session_state.show_result = True
-    state_show = st.empty()
-    if not st.session_state.get("show_result", False):
-        state_show.info("请先输入待检测文本，然后点击「开始检测」按钮。", icon="ℹ️")
-    else:
-        state_show.success("检测完成！请查看下方结果。", icon="✅")
-        st.balloons()
+    # 只为用户展开的行调用大模型，生成过的建议保存在会话中
+    advice = st.session_state.setdefault("batch_advice", {})
+    for index in event.selection.rows:
+        row = results.iloc[index]
+        with st.expander(f"📩 第 {index + 1} 条：{row['预测类别']}（{row['风险等级']}）", expanded=True, icon="🚀"):
+            st.write(row["短信内容"])
+            if index in advice:
+                st.markdown(advice[index])
+            else:
+                try:
+                    # 簇编号只在本次上传内有效，加上文件标识以免与单条检测的簇混用缓存的建议
+                    cluster_id = (uploaded.file_id, int(row["相似短信簇"]))
+                    advice[index] = st.write_stream(
+                        advice_stream(row["短信内容"], row["预测类别"], row["风险等级"], cluster_id)
+                    )
+                except Exception as e:
+                    st.error(f"⚠️ 发生错误: {str(e)}")
+
+
+# ---------------------------
+# 界面布局
+# ---------------------------
+# 标题
+st.markdown('<h1 class="main-title">🛡️ 智能诈骗信息检测 🚀</h1>', unsafe_allow_html=True)
+st.session_state.show_result = False
+
+detect_mode = st.radio("检测方式", ["单条检测", "批量上传"], horizontal=True, label_visibility="collapsed")
+
+if detect_mode == "批量上传":
+    render_batch_upload(analysis_depth, confidence_threshold)
+else:
+    text_col, button_col = st.columns([3, 1], gap="large")
+    result_area = st.empty()
+
+    # 输入区域
+    with text_col:
+        input_text = st.text_area(
+            "📝 请输入待检测的文本内容：",
+            height=100,
+            placeholder="例：【顺丰】尊敬的客户，您使用顺丰的频率较高，现赠送您暖风扇一台，请添加支付宝好友进行登记领取。",
+            help="支持中文文本检测，建议输入50-500字",
+        )
+    with button_col:
+        if st.button("开始检测", use_container_width=True, type="primary", help="点击进行诈骗信息检测"):
+            visualize_result(input_text, result_area.container(), analysis_depth, confidence_threshold, advice_timing)
+            st.session_state.show_result = True
+        state_show = st.empty()
+        if not st.session_state.get("show_result", False):
+            state_show.info("请先输入待检测文本，然后点击「开始检测」按钮。", icon="ℹ️")
+        else:
+            state_show.success("检测完成！请查看下方结果。", icon="✅")
+            st.balloons()
 
 
 @st.cache_resource(show_spinner=False)
 def draw_frq_fig():
+    import pandas as pd
+    import plotly.express as px
+
     try:
         with open("recognize/fraud_keywords.json", "r", encoding="utf-8") as f:
             words = json.load(f)
@@ -468,7 +770,7 @@ def draw_frq_fig():
     except Exception as e:
         st.error(f"直方图加载失败: {str(e)}")
 
-if not st.session_state.get("show_result", False):
+if detect_mode == "单条检测" and not st.session_state.get("show_result", False):
     with result_area.container():
         col1, col2 = st.columns([1, 1], gap="large")
         with col1: # 词云图
@@ -1,9 +1,6 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 
-from openai import OpenAI
-import openai
+# pandas、plotly、openai 只在用到的函数内导入，打开页面时不必加载
 
 st.markdown(
     """
@@ -79,12 +76,14 @@ with st.sidebar:
             st.session_state.openai_base_url = st.secrets['OPENAI_BASE_URL']
         
         if st.button('检查 API Key 可用性'):
-            import openai
+            import llm_gateway
             with st.spinner('正在验证...'):
                 try:
-                    openai.base_url = st.session_state.openai_base_url
-                    openai.api_key = st.session_state.openai_api_key
-                    openai.models.retrieve(st.session_state.openai_model)
+                    llm_gateway.check_model(
+                        st.session_state.openai_api_key,
+                        st.session_state.openai_base_url,
+                        st.session_state.openai_model,
+                    )
                     st.success('API Key 验证成功', icon='✅')
                 except Exception as e:
                     st.error(e, icon='❌')
@@ -108,12 +107,11 @@ def get_openai_response(user_profile):
 
     风险分析报告与建议内容：
     """
-    prompt = prompt_template.format(profile_str=profile_str)
-    client = OpenAI()
+    import llm_gateway
 
-    response = client.chat.completions.create(
-        model=st.session_state.openai_model,
-        messages=[
+    prompt = prompt_template.format(profile_str=profile_str)
+    return llm_gateway.stream_chat(
+        [
             {
                 "role": "system",
                 "content": "The following is a message that I received from a user and I need your help to respond to it.",
@@ -122,9 +120,7 @@ def get_openai_response(user_profile):
         ],
         max_tokens=1024,
         temperature=1.0,
-        stream=True
     )
-    return response
 
 def risk_assessment_page():
     # ========== 页面配置 ==========
@@ -267,6 +263,10 @@ def risk_assessment_page():
             st.toast(":rainbow[结果已就绪！]", icon="🎉")
             st.balloons()
         with tab2:
+            # 图表只在评估完成后绘制，打开页面时不必加载 pandas 与 plotly
+            import pandas as pd
+            import plotly.express as px
+
             c1, c2 = st.columns([1, 2])
             with c1:
                 st.markdown(
@@ -0,0 +1,33 @@
+"""
+递增知识图谱数据版本号。
+
+用法：
+    python scripts/bump_kg_version.py
+
+导入或修改 Neo4j 中的案件数据后运行，问答助手的 Cypher 缓存、schema 缓存与示例问题的预计算答案随之失效。
+只修改属性时节点数与关系数不变，不运行本脚本就会继续使用旧的缓存，直到缓存过期（CYPHER_CACHE_TTL）。
+连接信息读取 .streamlit/secrets.toml。
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import neo4j  # noqa: E402
+import toml  # noqa: E402
+
+from bot.tools.cypher_cache import BUMP_KG_VERSION_QUERY  # noqa: E402
+
+
+def main():
+    secrets = toml.load(os.path.join(ROOT, ".streamlit", "secrets.toml"))
+    with neo4j.GraphDatabase.driver(
+        secrets["NEO4J_URI"], auth=(secrets["NEO4J_USERNAME"], secrets["NEO4J_PASSWORD"])
+    ) as driver:
+        records, _, _ = driver.execute_query(BUMP_KG_VERSION_QUERY, database_=secrets["NEO4J_DATABASE"])
+    print(f"Knowledge graph version is now {records[0]['version']}")
+
+
+if __name__ == "__main__":
+    main()
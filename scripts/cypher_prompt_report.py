@@ -0,0 +1,139 @@
+"""
+Cypher 生成提示词的 token 对比与回归检查。
+
+用法：
+    python scripts/cypher_prompt_report.py
+    python scripts/cypher_prompt_report.py --k 2
+    python scripts/cypher_prompt_report.py --validate
+
+默认离线运行：对每个回归问题估算完整提示词与按问题筛选后提示词的 token 数。
+model/neo4j_schema 中有缓存的 schema 时一并计入，否则只统计手写部分。
+--validate 读取 .streamlit/secrets.toml，连接大模型与 Neo4j，用筛选后的提示词生成 Cypher，
+对每条 Cypher 执行 EXPLAIN 并检查其中的节点标签与关系类型都存在于 schema 中，
+任一问题失败时以非零状态退出。
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bot.tools.cypher_examples import (  # noqa: E402
+    CYPHER_GENERATION_TEMPLATE,
+    EXAMPLES,
+    NODE_LABEL_PATTERN,
+    RELATIONSHIP_TYPE_PATTERN,
+    full_context,
+    select_context,
+)
+from recognize.advice_cache import estimate_tokens  # noqa: E402
+
+# bot_page 的示例问题、示例库中的问题，以及示例库未覆盖的问法
+REGRESSION_QUESTIONS = list(dict.fromkeys([
+    "使用手机诈骗的案例有哪些？",
+    "有哪些人涉及到了虚假投资？",
+    "使用各类工具的诈骗案例分别占比多少？",
+    "涉嫌团伙作案的案件有哪些？",
+    *[question for question, _ in EXAMPLES],
+    "广东发生了哪些诈骗案件？",
+    "被判处有期徒刑的嫌疑人有哪些？",
+    "冒充公检法诈骗的案例有哪些？",
+    "涉及银行卡的案件一共有多少起？",
+    "哪些嫌疑人触犯了刑法？",
+]))
+SCHEMA_CACHE_DIR = os.path.join(ROOT, "model", "neo4j_schema")
+
+
+def cached_structured_schema():
+    """最近写入的 schema 缓存，没有时返回 None"""
+    paths = glob.glob(os.path.join(SCHEMA_CACHE_DIR, "*.json"))
+    if not paths:
+        return None
+    with open(max(paths, key=os.path.getmtime), "r", encoding="utf-8") as f:
+        return json.load(f)["structured_schema"]
+
+
+def prompt_tokens(question, context):
+    return estimate_tokens(CYPHER_GENERATION_TEMPLATE.format(schema=context, question=question))
+
+
+def token_report(questions, structured_schema, k):
+    full = [prompt_tokens(question, full_context(structured_schema)) for question in questions]
+    selected = [prompt_tokens(question, select_context(question, structured_schema, k=k)) for question in questions]
+    for question, before, after in zip(questions, full, selected):
+        print(f"{before:6d} -> {after:6d} ({after / before:6.1%})  {question}")
+    print(f"mean: {sum(full) / len(full):.0f} -> {sum(selected) / len(selected):.0f} tokens per Cypher generation")
+
+
+def unknown_types(cypher, structured_schema):
+    """Cypher 中出现但 schema 里不存在的节点标签与关系类型"""
+    labels = set(structured_schema.get("node_props", {}))
+    types = {relationship["type"] for relationship in structured_schema.get("relationships", [])}
+    return sorted(
+        {label for label in NODE_LABEL_PATTERN.findall(cypher) if label not in labels}
+        | {type_ for type_ in RELATIONSHIP_TYPE_PATTERN.findall(cypher) if type_ not in types}
+    )
+
+
+def validate(questions, k):
+    import toml
+    from langchain_neo4j import Neo4jGraph
+    from langchain_neo4j.chains.graph_qa.cypher import extract_cypher
+    from langchain_openai import ChatOpenAI
+
+    secrets = toml.load(os.path.join(ROOT, ".streamlit", "secrets.toml"))
+    llm = ChatOpenAI(
+        openai_api_key=secrets["OPENAI_API_KEY"],
+        model=secrets["OPENAI_MODEL"],
+        base_url=secrets["OPENAI_BASE_URL"],
+        temperature=0,
+    )
+    graph = Neo4jGraph(
+        url=secrets["NEO4J_URI"],
+        username=secrets["NEO4J_USERNAME"],
+        password=secrets["NEO4J_PASSWORD"],
+        database=secrets["NEO4J_DATABASE"],
+    )
+
+    failed = []
+    for question in questions:
+        prompt = CYPHER_GENERATION_TEMPLATE.format(
+            schema=select_context(question, graph.structured_schema, k=k), question=question
+        )
+        cypher = extract_cypher(llm.invoke(prompt).content)
+        error = None
+        try:
+            graph.query(f"EXPLAIN {cypher}")
+            unknown = unknown_types(cypher, graph.structured_schema)
+            if unknown:
+                error = f"unknown labels or relationship types: {', '.join(unknown)}"
+        except Exception as e:
+            error = str(e).splitlines()[0]
+        print(f"[{'FAIL' if error else 'ok'}] {question}")
+        print("  " + cypher.replace("\n", "\n  "))
+        if error:
+            print(f"  error: {error}")
+            failed.append(question)
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions", nargs="*", default=REGRESSION_QUESTIONS)
+    parser.add_argument("--k", type=int, default=3, help="每个问题挑选的示例数")
+    parser.add_argument("--validate", action="store_true", help="连接大模型与 Neo4j 检查生成的 Cypher")
+    args = parser.parse_args()
+
+    token_report(args.questions, cached_structured_schema(), args.k)
+    if args.validate:
+        failed = validate(args.questions, args.k)
+        if failed:
+            print(f"{len(failed)}/{len(args.questions)} questions produced invalid Cypher", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
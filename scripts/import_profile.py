@@ -0,0 +1,205 @@
+"""
+页面冷启动导入耗时分析。
+
+用法：
+    python scripts/import_profile.py
+    python scripts/import_profile.py --check
+    python scripts/import_profile.py --check --budget recognize_page.py=1500 --default-budget 1000
+
+对每个页面，在全新的 Python 进程中以 -X importtime 运行 streamlit 的 AppTest，完整执行一遍页面脚本，
+统计打开页面时页面本身发生的导入及其耗时，包括 with 块中在页面运行时发生的导入；
+只有用户操作后才会执行的分支中的导入不计入。streamlit 自身在开始运行页面之前已导入，不计入预算。
+加载模型、启动预加载、连接数据库的 st.cache_resource 资源（STUB_RESOURCES）替换为不做任何事的替身，
+其余缓存资源（如关键词频率图）照常执行；页面使用 .streamlit/secrets.template.toml 中的示例配置运行，不需要真实的密钥，
+因此预算只衡量页面级导入，结果稳定，可在 CI 中运行。
+--check 时任一页面超出预算（毫秒）或运行出错，以非零状态退出，可用于 CI 防止导入耗时回退；
+tests/test_import_budget.py 以 pytest 的形式执行同样的检查。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["app.py", "start_page.py", "recognize_page.py", "bot_page.py", "risk_page.py", "search_page.py", "show_page.py"]
+SECRETS_PATH = os.path.join(ROOT, ".streamlit", "secrets.template.toml")
+# 页面运行时新增导入的预算（毫秒），不含 streamlit 自身
+DEFAULT_BUDGET_MS = 1000
+BUDGETS_MS = {
+    "recognize_page.py": 1500,
+}
+# 会加载模型、启动后台预加载或连接外部服务的缓存资源，剖析时不执行
+STUB_RESOURCES = r"init_\w+|start_warmup|connect_to_neo4j|refresh_precomputed_answers"
+MARKER = "--import-profile-start--"
+# 在子进程中运行页面：准备好 streamlit 与 AppTest 后输出 MARKER，之后的导入才计入页面
+RUNNER = """
+import functools, json, os, re, sys
+import toml
+import streamlit as st
+from streamlit import config
+from streamlit.testing.v1 import AppTest
+
+
+class Stub:
+    \"\"\"缓存资源的替身：属性、调用、下标与 with 都返回自身，迭代时为空\"\"\"
+
+    def __getattr__(self, name):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __getitem__(self, key):
+        return self
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+def cache_resource(func=None, **options):
+    if func is None:
+        return functools.partial(cache_resource, **options)
+    if not re.fullmatch(stub_resources, func.__name__):
+        return real_cache_resource(func, **options)
+
+    @functools.wraps(func)
+    def stub(*args, **kwargs):
+        return Stub()
+
+    stub.clear = lambda *args, **kwargs: None
+    return stub
+
+
+page, secrets_path, timeout, marker, stub_resources = sys.argv[1:]
+real_cache_resource = st.cache_resource
+cache_resource.clear = real_cache_resource.clear
+st.cache_resource = cache_resource
+
+secrets = toml.load(secrets_path)
+# 报告中需要完整的错误信息
+config.set_option("client.showErrorDetails", True)
+# 先运行一个空脚本，streamlit 运行脚本时才加载的模块不计入页面
+AppTest.from_string("").run()
+at = AppTest.from_file(os.path.abspath(page), default_timeout=float(timeout))
+for key, value in secrets.items():
+    at.secrets[key] = value
+# 单独运行页面时补上 app.py 写入的会话状态
+for key in ("uri", "username", "database", "password"):
+    if f"NEO4J_{key.upper()}" in secrets:
+        at.session_state[f"neo4j_{key}"] = secrets[f"NEO4J_{key.upper()}"]
+print(marker, file=sys.stderr, flush=True)
+try:
+    at.run()
+    errors = [exception.message for exception in at.exception]
+except Exception as e:
+    errors = [f"{type(e).__name__}: {e}"]
+print(json.dumps(errors), flush=True)
+"""
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 的输出，返回 [(模块, 嵌套层级, 自身微秒, 累计微秒), ...]"""
+    lines = stderr.splitlines()
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1:]
+    modules = []
+    for line in lines:
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return modules
+
+
+def profile_page(page, top=10, timeout=120, secrets_path=SECRETS_PATH):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUNNER, page, secrets_path, str(timeout), MARKER, STUB_RESOURCES],
+        cwd=ROOT, capture_output=True, text=True, timeout=timeout + 60,
+    )
+    modules = parse_importtime(proc.stderr)
+    report = {
+        "page": page,
+        "total_ms": sum(cumulative for _, depth, _, cumulative in modules if depth == 0) / 1000,
+        "modules": len(modules),
+        # 页面直接导入的模块及其累计耗时
+        "direct": [
+            {"module": name, "cumulative_ms": cumulative / 1000}
+            for name, depth, _, cumulative in sorted(modules, key=lambda m: m[3], reverse=True)
+            if depth == 0
+        ][:top],
+        # 自身耗时最多的模块，不论由谁导入
+        "heaviest": [
+            {"module": name, "self_ms": self_us / 1000}
+            for name, _, self_us, _ in sorted(modules, key=lambda m: m[2], reverse=True)
+        ][:top],
+    }
+    output = proc.stdout.strip().splitlines()
+    if proc.returncode == 0 and output:
+        errors = json.loads(output[-1])
+    else:
+        errors = (proc.stderr.strip().splitlines() or [f"exit status {proc.returncode}"])[-1:]
+    if errors:
+        report["error"] = errors[0].strip()
+    return report
+
+
+def print_report(report, budget):
+    status = "FAIL" if "error" in report or report["total_ms"] > budget else "ok"
+    print(f"{report['page']}: {report['total_ms']:.0f} ms / budget {budget} ms, {report['modules']} modules [{status}]")
+    if "error" in report:
+        print(f"  error: {report['error']}")
+    for item in report["direct"]:
+        print(f"  {item['cumulative_ms']:9.1f} ms  {item['module']}")
+    print("  heaviest by self time:")
+    for item in report["heaviest"]:
+        print(f"  {item['self_ms']:9.1f} ms  {item['module']}")
+
+
+def parse_budget(value):
+    page, _, ms = value.partition("=")
+    if not ms:
+        raise argparse.ArgumentTypeError("expected PAGE=MS")
+    return page, int(ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", default=PAGES)
+    parser.add_argument("--check", action="store_true", help="超出预算时以非零状态退出")
+    parser.add_argument("--budget", action="append", type=parse_budget, default=[], help="单个页面的预算，如 recognize_page.py=1500")
+    parser.add_argument("--default-budget", type=int, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10, help="每个页面列出的模块数")
+    parser.add_argument("--timeout", type=float, default=120, help="单个页面运行的超时时间（秒）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出报告")
+    args = parser.parse_args()
+
+    budgets = {**BUDGETS_MS, **dict(args.budget)}
+    reports = [profile_page(page, top=args.top, timeout=args.timeout) for page in args.pages]
+    failed = [
+        report["page"] for report in reports
+        if "error" in report or report["total_ms"] > budgets.get(report["page"], args.default_budget)
+    ]
+    if args.json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+    else:
+        for report in reports:
+            print_report(report, budgets.get(report["page"], args.default_budget))
+    if args.check and failed:
+        print(f"Import budget exceeded: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
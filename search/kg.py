@@ -1,7 +1,5 @@
 import sys
-import neo4j
 import streamlit as st
-from pyvis.network import Network
 import os
 import uuid
 
@@ -43,6 +41,8 @@ rel_color_map = {
 @st.cache_resource(ttl=120, show_spinner=False)
 def connect_to_neo4j():
     """连接 Neo4j 数据库"""
+    import neo4j
+
     uri = st.session_state.neo4j_uri
     username = st.session_state.neo4j_username
     password = st.session_state.neo4j_password
@@ -53,6 +53,8 @@ def connect_to_neo4j():
 # 可视化函数
 # ============================
 def init_net():
+    from pyvis.network import Network
+
     net = Network(
         directed=True,
         height="800px",
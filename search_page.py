@@ -1,10 +1,4 @@
-from scipy.__config__ import show
 import streamlit as st
-import pandas as pd
-import neo4j
-from pyvis.network import Network
-import plotly.express as px
-import time
 from search import kg
 
 
@@ -16,6 +10,8 @@ from search import kg
 @st.cache_resource(ttl=120, show_spinner=False)
 def connect_to_neo4j():
     """连接 Neo4j 数据库"""
+    import neo4j
+
     uri = st.session_state.neo4j_uri
     username = st.session_state.neo4j_username
     password = st.session_state.neo4j_password
@@ -137,6 +133,7 @@ def search_cases(keyword, skip=0, limit=30):
 
         # 查询案件详情
         result = session.run(query_template, keyword=keyword, skip=skip, limit=limit)
+        import pandas as pd
         return total_count, pd.DataFrame(result.data())
 
 # @st.cache_data(ttl=3600, show_spinner=False)
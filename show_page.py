@@ -4,8 +4,6 @@ import os
 from datetime import datetime
 from filelock import FileLock
 import uuid
-import pandas as pd
-import plotly.express as px
 
 # 配置文件路径
 DATA_FILE = "show/articles.json"
@@ -131,6 +129,9 @@ def show_article_detail(article_id):
     st.subheader("📈 阅读趋势")
 
     if len(article["view_timestamps"]) > 0:
+        import pandas as pd
+        import plotly.express as px
+
         # 准备数据
         df = pd.DataFrame({
             "timestamp": pd.to_datetime(article["view_timestamps"])
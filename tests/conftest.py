@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def repo_cwd():
+    """模型、关键词表等路径都相对仓库根目录"""
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    yield ROOT
+    os.chdir(cwd)
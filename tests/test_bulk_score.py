@@ -0,0 +1,43 @@
+import csv
+import json
+
+import pytest
+
+from recognize.bulk_score import read_rows
+
+ROWS = [
+    {"id": "1", "text": "您的快递丢失，请联系客服理赔"},
+    {"id": "2", "text": "多行短信\n第二行，含有\"引号\"和,逗号"},
+    {"id": "3", "text": ""},
+    {"id": "4", "text": "明天下午三点开会"},
+]
+
+
+@pytest.fixture(params=["csv", "jsonl"])
+def path(request, tmp_path):
+    path = tmp_path / f"dump.{request.param}"
+    if request.param == "csv":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["id", "text"])
+            writer.writeheader()
+            writer.writerows(ROWS)
+    else:
+        # 空行会被跳过
+        path.write_text("\n".join(json.dumps(row, ensure_ascii=False) for row in ROWS) + "\n\n", encoding="utf-8")
+    return str(path)
+
+
+def test_reads_every_row(path):
+    rows = list(read_rows(path, "text"))
+
+    assert [(offset, row, text) for offset, row, text, _ in rows] == [
+        (i, row, row["text"]) for i, row in enumerate(ROWS)
+    ]
+
+
+@pytest.mark.parametrize("done", [1, 2, 3])
+def test_resumes_from_the_recorded_byte_position(path, done):
+    rows = list(read_rows(path, "text"))
+    position = rows[done - 1][3]
+
+    assert list(read_rows(path, "text", done, position)) == rows[done:]
@@ -0,0 +1,137 @@
+import hashlib
+import http.server
+import os
+import re
+import threading
+
+import pytest
+
+pytest.importorskip("requests")
+
+from recognize import download  # noqa: E402
+
+PAYLOAD = os.urandom(256 * 1024 + 123)
+SHA256 = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    """支持 Range 请求的文件服务器；truncate 次数内的响应只发送一半内容后断开"""
+
+    server_version = "test"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        state = self.server.state
+        state["ranges"].append(self.headers.get("Range"))
+        start = 0
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range") or "")
+        if match:
+            start = int(match.group(1))
+            if start >= len(PAYLOAD):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(PAYLOAD)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        body = PAYLOAD[start:]
+        self.send_response(206 if match else 200)
+        if match:
+            self.send_header("Content-Range", f"bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if state["truncate"] > 0:
+            state["truncate"] -= 1
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(download.time, "sleep", lambda seconds: None)
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    httpd.state = {"ranges": [], "truncate": 0}
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/model.pth"
+
+
+def test_resume_from_partial_file(server, tmp_path):
+    path = tmp_path / "model.pth"
+    (tmp_path / "model.pth.part").write_bytes(PAYLOAD[:1000])
+
+    download.download_file(url(server), str(path), sha256=SHA256)
+
+    assert path.read_bytes() == PAYLOAD
+    assert server.state["ranges"] == ["bytes=1000-"]
+    assert not (tmp_path / "model.pth.part").exists()
+
+
+def test_retry_resumes_interrupted_transfer(server, tmp_path):
+    server.state["truncate"] = 2
+    path = tmp_path / "model.pth"
+
+    # 块要小于半个文件，断开前收到的部分才会写入 .part
+    download.download_file(url(server), str(path), sha256=SHA256, chunk_size=16 * 1024, retries=3)
+
+    assert path.read_bytes() == PAYLOAD
+    assert server.state["ranges"][0] is None
+    assert all(r.startswith("bytes=") for r in server.state["ranges"][1:])
+    assert len(server.state["ranges"]) == 3
+
+
+def test_gives_up_after_retries(server, tmp_path):
+    server.state["truncate"] = 10
+
+    with pytest.raises(download.requests.exceptions.ChunkedEncodingError):
+        download.download_file(url(server), str(tmp_path / "model.pth"), retries=1)
+    assert not (tmp_path / "model.pth").exists()
+
+
+def test_checksum_mismatch_removes_download(server, tmp_path):
+    path = tmp_path / "model.pth"
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        download.download_file(url(server), str(path), sha256="0" * 64)
+    assert not path.exists()
+    assert not (tmp_path / "model.pth.part").exists()
+
+
+def test_corrupt_complete_part_is_downloaded_again(server, tmp_path):
+    path = tmp_path / "model.pth"
+    (tmp_path / "model.pth.part").write_bytes(bytes(len(PAYLOAD)))
+
+    download.download_file(url(server), str(path), sha256=SHA256)
+
+    assert path.read_bytes() == PAYLOAD
+    assert server.state["ranges"] == [f"bytes={len(PAYLOAD)}-", None]
+
+
+def test_oversized_part_without_checksum_is_downloaded_again(server, tmp_path):
+    path = tmp_path / "model.pth"
+    (tmp_path / "model.pth.part").write_bytes(PAYLOAD + b"garbage")
+
+    download.download_file(url(server), str(path))
+
+    assert path.read_bytes() == PAYLOAD
+    assert server.state["ranges"] == [f"bytes={len(PAYLOAD) + 7}-", None]
+
+
+def test_complete_part_without_checksum_is_kept(server, tmp_path):
+    path = tmp_path / "model.pth"
+    (tmp_path / "model.pth.part").write_bytes(PAYLOAD)
+
+    download.download_file(url(server), str(path))
+
+    assert path.read_bytes() == PAYLOAD
+    assert server.state["ranges"] == [f"bytes={len(PAYLOAD)}-"]
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+import import_profile  # noqa: E402
+
+
+@pytest.mark.parametrize("page", import_profile.PAGES)
+def test_page_import_budget(page):
+    report = import_profile.profile_page(page)
+    budget = import_profile.BUDGETS_MS.get(page, import_profile.DEFAULT_BUDGET_MS)
+    heaviest = ", ".join(f"{item['module']} {item['cumulative_ms']:.0f} ms" for item in report["direct"])
+
+    assert report["total_ms"] <= budget, f"{page} imports {report['total_ms']:.0f} ms > {budget} ms: {heaviest}"
+    assert "error" not in report, f"{page} failed while running: {report['error']}"
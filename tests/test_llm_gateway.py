@@ -0,0 +1,131 @@
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("streamlit")
+openai = pytest.importorskip("openai")
+httpx = pytest.importorskip("httpx")
+
+import llm_gateway  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "这条短信是诈骗吗？"}]
+CHUNKS = ["这", "是", "一条", "诈骗", "短信"]
+
+
+class FakeUpstream:
+    """以 SSE 流式返回 CHUNKS 的传输层；gate 未放行前只发送第一个片段"""
+
+    def __init__(self, status=200):
+        self.status = status
+        self.requests = []
+        self.sent = 0
+        self.gate = threading.Event()
+
+    def handler(self, request):
+        self.requests.append(json.loads(request.content))
+        if self.status != 200:
+            return httpx.Response(self.status, json={"error": {"message": "bad request"}})
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=self.events())
+
+    def events(self):
+        for i, text in enumerate(CHUNKS):
+            if i == 1:
+                self.gate.wait(5)
+            self.sent += 1
+            chunk = {
+                "id": "chunk",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": "deepseek-chat",
+                "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+        yield b"data: [DONE]\n\n"
+
+
+@pytest.fixture
+def upstream():
+    return FakeUpstream()
+
+
+@pytest.fixture
+def gateway(upstream):
+    return llm_gateway.LLMGateway(transport=httpx.MockTransport(upstream.handler))
+
+
+def stream(gateway, messages=MESSAGES):
+    return gateway.stream_chat(messages, model="deepseek-chat", api_key="sk-test", base_url="http://upstream.test")
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_identical_requests_share_one_upstream_stream(gateway, upstream):
+    first = stream(gateway)
+    assert next(first) == CHUNKS[0]
+    # 第二个订阅者加入时请求仍在进行中，先收到已经到达的片段
+    second = stream(gateway)
+    upstream.gate.set()
+
+    assert [CHUNKS[0], *first] == CHUNKS
+    assert list(second) == CHUNKS
+    assert len(upstream.requests) == 1
+    assert gateway.stats()["coalesced"] == 1
+
+
+def test_different_requests_are_sent_separately(gateway, upstream):
+    upstream.gate.set()
+    other = [{"role": "user", "content": "这条短信正常吗？"}]
+
+    assert list(stream(gateway)) == CHUNKS
+    assert list(stream(gateway, other)) == CHUNKS
+    assert len(upstream.requests) == 2
+    assert gateway.stats()["coalesced"] == 0
+
+
+def test_upstream_error_is_raised_to_every_subscriber():
+    upstream = FakeUpstream(status=400)
+    gateway = llm_gateway.LLMGateway(transport=httpx.MockTransport(upstream.handler))
+
+    for subscription in (stream(gateway), stream(gateway)):
+        with pytest.raises(openai.BadRequestError):
+            list(subscription)
+
+
+def test_upstream_stops_when_every_subscriber_closes(gateway, upstream):
+    first, second = stream(gateway), stream(gateway)
+    assert next(first) == CHUNKS[0]
+    first.close()
+    second.close()
+    upstream.gate.set()
+
+    wait_until(lambda: gateway.stats()["in_flight"] == 0)
+    assert upstream.sent < len(CHUNKS)
+    # 被放弃的请求不能再加入，相同的新请求重新发往上游
+    assert list(stream(gateway)) == CHUNKS
+    assert len(upstream.requests) == 2
+
+
+def test_remaining_subscriber_keeps_the_stream(gateway, upstream):
+    first, second = stream(gateway), stream(gateway)
+    first.close()
+    upstream.gate.set()
+
+    assert list(second) == CHUNKS
+    assert len(upstream.requests) == 1
+
+
+def test_client_cache_evicts_least_recently_used(upstream):
+    gateway = llm_gateway.LLMGateway(max_clients=2, transport=httpx.MockTransport(upstream.handler))
+    first = gateway.client("sk-1", "http://upstream.test")
+    gateway.client("sk-2", "http://upstream.test")
+    assert gateway.client("sk-1", "http://upstream.test") is first
+    gateway.client("sk-3", "http://upstream.test")
+
+    assert list(gateway.clients) == [("sk-1", "http://upstream.test"), ("sk-3", "http://upstream.test")]
@@ -0,0 +1,65 @@
+from recognize.near_dup import NearDupIndex, sketch, tokens
+
+TEMPLATE = "【通知】您的快递丢失，请加微信{wechat}办理理赔，客服电话{phone}，访问{url}领取{amount}元"
+
+
+def campaign(wechat, phone, url, amount):
+    return TEMPLATE.format(wechat=wechat, phone=phone, url=url, amount=amount)
+
+
+def test_variable_slots_are_masked_and_ascii_words_kept():
+    assert tokens("访问abc.com 于2024年1月2日 10:00 转账¥1,000.5 到6222020200112233445 电话13812345678") == [
+        "访", "问", "<url>", "于", "<date>", "<date>", "转", "账", "<amount>", "到", "<card>", "电", "话", "<phone>",
+    ]
+    assert tokens("Meeting moved to 3pm") == ["meeting", "moved", "to", "3pm"]
+
+
+def test_campaign_variants_share_a_cluster():
+    index = NearDupIndex()
+    first = index.assign(campaign("wei1in12345", "13812345678", "abc.com", 300))
+    second = index.assign(campaign("wei2xx99887", "13999999999", "http://xyz.top/a", 500))
+    assert first is second
+    assert first.size == 2
+
+
+def test_unrelated_ascii_messages_are_not_clustered():
+    index = NearDupIndex()
+    first = index.assign("Meeting moved to 3pm tomorrow, see you there, bring the slides and the budget numbers please")
+    assert len(first.hashes) >= index.min_shingles
+    second = index.assign("URGENT your bank account is frozen, verify at http://x.co now or you will lose access to your funds")
+    assert first is not second
+
+
+def test_short_messages_are_never_reused():
+    index = NearDupIndex()
+    first = index.assign("您尾号1234的银行卡于10:00消费500元")
+    second = index.assign("您尾号1234的银行卡于12:30消费80元")
+    assert first is not second
+    assert index.stats()["clusters"] == 0
+
+
+def test_precomputed_sketch_matches_index():
+    index = NearDupIndex()
+    text = campaign("wei1in12345", "13812345678", "abc.com", 300)
+    cluster = index.assign(text, sketch(text, index.num_perm))
+    assert index.assign(text) is cluster
+
+
+def test_capacity_evicts_least_recent_cluster():
+    index = NearDupIndex(capacity=2)
+    texts = [
+        campaign("wei1in12345", "13812345678", "abc.com", 300),
+        "您的账户涉嫌洗钱，请立即将资金转入安全账户配合调查，否则将冻结您名下所有银行卡。",
+        "妈，我手机掉水里了，这是我同学的号，急需交学费，先转到这个卡上。",
+    ]
+    clusters = [index.assign(text) for text in texts]
+    assert index.stats()["clusters"] == 2
+    assert index.assign(texts[0]) is not clusters[0]
+
+
+def test_cluster_ids_continue_from_first_id():
+    index = NearDupIndex(first_id=41)
+    first = index.assign(campaign("wei1in12345", "13812345678", "abc.com", 300))
+    short = index.assign("好的")
+
+    assert (first.id, short.id, index.next_id) == (41, 42, 43)
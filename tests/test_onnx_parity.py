@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("onnxruntime")
+
+from recognize import fraud_msg_cls  # noqa: E402
+
+SAMPLE = [
+    "【顺丰】尊敬的客户，您使用顺丰的频率较高，现赠送您暖风扇一台，请添加支付宝好友进行登记领取。",
+    "您好，抖音上发现有人提供替考驾驶证服务，每科仅需1400元，微信号为wei1in12345，如有需要请联系，我们保证快速通过考试。",
+    "您的账户涉嫌洗钱，请立即将资金转入安全账户配合调查，否则将冻结您名下所有银行卡。",
+    "妈，我手机掉水里了，这是我同学的号，急需交学费5000元，先转到这个卡上。",
+    "明天下午三点开会，请准时参加。",
+    "",
+]
+MAX_ABS_LOGIT_DIFF = 1e-3
+
+
+@pytest.fixture(scope="module")
+def models():
+    if not os.path.exists(fraud_msg_cls.MODEL_PATH):
+        pytest.skip(f"{fraud_msg_cls.MODEL_PATH} not found")
+    return fraud_msg_cls.MsgClsModel(backend="torch"), fraud_msg_cls.MsgClsModel(backend="onnx")
+
+
+def test_onnx_logits_match_torch(models):
+    torch_model, onnx_model = models
+    encodings = torch_model.tokenize(SAMPLE)
+    expected = torch_model.logits(encodings)
+    actual = onnx_model.logits(encodings)
+
+    assert (expected - actual).abs().max().item() < MAX_ABS_LOGIT_DIFF
+    assert expected.argmax(dim=1).tolist() == actual.argmax(dim=1).tolist()
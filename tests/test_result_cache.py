@@ -0,0 +1,26 @@
+from recognize.result_cache import ResultCache
+
+
+def test_put_many_is_read_back_after_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResultCache(path=path, version="v1")
+    cache.put_many([(f"短信 {i}", {"prediction": "正常短信", "probability": i / 10}) for i in range(10)])
+    cache.put("另一条短信", {"prediction": "冒充客服", "probability": 0.9})
+
+    reopened = ResultCache(path=path, version="v1")
+    assert reopened.get("短信 3") == {"prediction": "正常短信", "probability": 0.3}
+    assert reopened.get("另一条短信")["prediction"] == "冒充客服"
+    assert reopened.stats()["disk_size"] == 11
+
+
+def test_version_change_clears_disk_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    ResultCache(path=path, version="v1").put_many([("短信", {"prediction": "正常短信"})])
+
+    assert ResultCache(path=path, version="v2").get("短信") is None
+
+
+def test_put_many_with_no_items(tmp_path):
+    cache = ResultCache(path=str(tmp_path / "cache.sqlite"))
+    cache.put_many([])
+    assert cache.stats()["disk_size"] == 0
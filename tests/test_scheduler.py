@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from recognize.scheduler import InferenceScheduler
+
+
+class FakeModel:
+    """记录每次 predict_batch 的输入；gate 未放行前阻塞第一次调用，让后续请求在队列中积压"""
+
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+
+    def predict_batch(self, texts, batch_size, max_windows):
+        self.batches.append(list(texts))
+        if len(self.batches) == 1:
+            self.entered.set()
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return [[(text.upper(), 1.0)] for text in texts]
+
+
+@pytest.fixture
+def model():
+    return FakeModel()
+
+
+def test_queued_requests_are_coalesced_up_to_max_batch_size(model):
+    scheduler = InferenceScheduler(model, max_batch_size=3, max_wait_ms=0)
+    first = scheduler.submit("a")
+    assert model.entered.wait(5)
+    futures = [scheduler.submit(text) for text in "bcdef"]
+    model.gate.set()
+
+    assert first.result(5) == [("A", 1.0)]
+    assert [future.result(5) for future in futures] == [[(text.upper(), 1.0)] for text in "bcdef"]
+    assert model.batches == [["a"], ["b", "c", "d"], ["e", "f"]]
+    assert scheduler.stats()["batch_size_histogram"] == {1: 1, 2: 1, 3: 1}
+    scheduler.shutdown()
+
+
+def test_waits_at_most_max_wait_for_a_full_batch(model):
+    model.gate.set()
+    scheduler = InferenceScheduler(model, max_batch_size=32, max_wait_ms=50)
+
+    start = time.monotonic()
+    assert scheduler.predict("a", timeout=5) == [("A", 1.0)]
+    elapsed = time.monotonic() - start
+
+    assert 0.04 <= elapsed < 2
+    assert model.batches == [["a"]]
+    scheduler.shutdown()
+
+
+def test_model_error_is_set_on_every_future_in_the_batch():
+    model = FakeModel(error=ValueError("bad input"))
+    scheduler = InferenceScheduler(model, max_batch_size=8, max_wait_ms=0)
+    first = scheduler.submit("a")
+    assert model.entered.wait(5)
+    futures = [scheduler.submit(text) for text in "bc"]
+    model.gate.set()
+
+    for future in [first, *futures]:
+        with pytest.raises(ValueError, match="bad input"):
+            future.result(5)
+    # 出错后调度器继续处理新的请求
+    model.error = None
+    assert scheduler.predict("d", timeout=5) == [("D", 1.0)]
+    scheduler.shutdown()
+
+
+def test_cancelled_requests_are_skipped(model):
+    scheduler = InferenceScheduler(model, max_batch_size=8, max_wait_ms=0)
+    scheduler.submit("a")
+    assert model.entered.wait(5)
+    cancelled, kept = scheduler.submit("b"), scheduler.submit("c")
+    assert cancelled.cancel()
+    model.gate.set()
+
+    assert kept.result(5) == [("C", 1.0)]
+    assert model.batches == [["a"], ["c"]]
+    scheduler.shutdown()
+
+
+def test_shutdown_drains_submitted_requests_and_rejects_new_ones(model):
+    scheduler = InferenceScheduler(model, max_batch_size=2, max_wait_ms=0)
+    scheduler.submit("a")
+    assert model.entered.wait(5)
+    futures = [scheduler.submit(text) for text in "bcd"]
+    scheduler.shutdown(wait=False)
+    model.gate.set()
+    scheduler.thread.join(5)
+
+    assert not scheduler.thread.is_alive()
+    assert [future.result(0) for future in futures] == [[(text.upper(), 1.0)] for text in "bcd"]
+    with pytest.raises(RuntimeError):
+        scheduler.submit("e")
+    # 重复调用不会出错
+    scheduler.shutdown()